@@ -0,0 +1,137 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import copy
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from thunkd import thunkd
+
+def buildProject(screens, components):
+    """
+    Builds a synthetic pulled project with every dirty field set, and the given number of screens, each with its own
+    blockly entry holding generated code.
+
+    Args:
+        screens (int): The number of screens.
+        components (int): The number of UI elements on each screen.
+
+    Returns:
+        dict: The project.
+    """
+    project = {'data': {'user': {'id': 'u', 'email': 'user@example.com'}, 'project': {}}}
+    iproject = project['data']['project']
+    for path in thunkd.DIRTY_PATHS:
+        if '*' not in path:
+            node = project
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = 'dirty'
+    iproject['projectName'] = 'Benchmark'
+    iproject['blockly'] = {
+        f"s{i}": {'xml': '<xml>' + '<block type="text"/>' * components + '</xml>', 'code': 'x = 1;\n' * components,
+                  'appVariableDefCode': 'var x;'}
+        for i in range(screens)
+    }
+    iproject['components'] = {'type': 'App', 'children': [
+        {'type': 'Screen', 'name': f"Screen{i}", 'id': f"s{i}", 'children': [
+            {'type': 'Label', 'id': f"c{i}-{j}", 'text': 'Hello', 'style': {'width': j, 'height': [1, 2, 3]}}
+            for j in range(components)
+        ]}
+        for i in range(screens)
+    ]}
+    iproject['modules'] = []
+    return project
+
+def deletePathIfExists(d, path):
+    # The per-path deletion to_clean_project used before the rule trie.
+    if len(path) == 0 or not isinstance(d, dict) or path[0] not in d:
+        return
+    if len(path) == 1:
+        del d[path[0]]
+        return
+    deletePathIfExists(d[path[0]], path[1:])
+
+def oldCleanProject(project):
+    """
+    The previous to_clean_project: a deep copy, then one walk per dirty path and two per screen.
+    """
+    project = copy.deepcopy(project)
+    dirty_paths = [list(path) for path in thunkd.DIRTY_PATHS if '*' not in path]
+    iproject = project['data']['project']
+    for screen_id in iproject['blockly']:
+        for prop in ['code', 'appVariableDefCode']:
+            if prop in iproject['blockly'][screen_id]:
+                dirty_paths.append(['data', 'project', 'blockly', screen_id, prop])
+    for path in dirty_paths:
+        deletePathIfExists(project, path)
+    return project
+
+def newCleanProject(project):
+    # to_clean_project without the CLEAN_PATHS of the local config.json, so both sides apply the same rules.
+    thunkd.prune(d=project, trie=thunkd.get_clean_rules())
+    return project
+
+def timeIt(func, project, repeat, copy_input):
+    """
+    Returns the best time of func over repeat runs. With copy_input, each run gets a fresh copy of the project,
+    made outside the timing, because the function cleans it in place.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        data = copy.deepcopy(project) if copy_input else project
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bench_clean_project",
+        description="Compare cleaning a pulled project with the per-path deletion and with the compiled rule trie."
+    )
+    parser.add_argument("--screens", type=int, nargs="+", default=[30, 300, 1000])
+    parser.add_argument("--components", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    print(f"{'screens':>7} {'components':>10} {'per-path ms':>12} {'trie ms':>9} {'speed-up':>9}  equal")
+    for screens in args.screens:
+        project = buildProject(screens, args.components)
+        equal = oldCleanProject(project) == newCleanProject(copy.deepcopy(project))
+        old_time = timeIt(oldCleanProject, project, args.repeat, copy_input=False)
+        new_time = timeIt(newCleanProject, project, args.repeat, copy_input=True)
+        print(f"{screens:>7} {screens * args.components:>10} {old_time * 1000:>12.2f} {new_time * 1000:>9.3f}"
+              f" {old_time / new_time:>8.0f}x  {equal}")
+        if not equal:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
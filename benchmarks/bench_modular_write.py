@@ -0,0 +1,139 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import sys
+import time
+import pickle
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from thunkd import thunkd
+
+def buildModularProject(screens, components):
+    """
+    Builds a synthetic modular project with the given number of screens, each with its own block XML.
+
+    Args:
+        screens (int): The number of screens.
+        components (int): The number of UI elements on each screen.
+
+    Returns:
+        dict: The modular project.
+    """
+    modular_project = {'meta.json': {'data': {'project': {'projectName': 'Benchmark', 'blockly': {}}}}}
+    for i in range(screens):
+        modular_project[f"Screen{i}.s{i}.json"] = {
+            'type': 'Screen',
+            'name': f"Screen{i}",
+            'id': f"s{i}",
+            'children': [
+                {'type': 'Label', 'id': f"c{i}-{j}", 'text': 'Hello ' * 20, 'style': {'width': j, 'height': [1, 2, 3]}}
+                for j in range(components)
+            ],
+        }
+        modular_project[f"Screen{i}.s{i}.xml"] = '<xml>' + '<block type="text"/>' * components + '</xml>'
+    return modular_project
+
+def noop():
+    return None
+
+def timeIt(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measurePoolStartup(workers, repeat):
+    """
+    Returns the time to start a process pool and have every worker run a task, then shut it down.
+    """
+    def run():
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(noop) for _ in range(workers)]:
+                future.result()
+    return timeIt(run, repeat)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bench_modular_write",
+        description="Measure how writing and encoding a modular project scales with the number of worker processes."
+    )
+    parser.add_argument("--screens", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--components", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Defaults to 1, 2, 4, ... up to the CPU count.")
+    parser.add_argument("--start-method", default="spawn", choices=multiprocessing.get_all_start_methods(),
+                        help="Defaults to spawn, the only start method on Windows.")
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    multiprocessing.set_start_method(args.start_method, force=True)
+
+    cpu_count = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, cpu_count} | {2 ** i for i in range(1, cpu_count.bit_length()) if 2 ** i <= cpu_count})
+    print(f"CPUs: {cpu_count}, start method: {args.start_method}, PARALLEL_WRITE_BYTES_PER_WORKER: {thunkd.PARALLEL_WRITE_BYTES_PER_WORKER}")
+
+    print("\nPool startup (start, one task per worker, shut down):")
+    for workers in workers_list:
+        if workers > 1:
+            print(f"  {workers:>3} workers: {measurePoolStartup(workers, args.repeat) * 1000:8.1f} ms")
+
+    out_dir = Path(tempfile.mkdtemp())
+    try:
+        for screens in args.screens:
+            modular_project = buildModularProject(screens, args.components)
+            pickled_size = sum(len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)) for data in modular_project.values())
+            pickle_time = timeIt(lambda: [pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL) for data in modular_project.values()], args.repeat)
+            print(f"\n{len(modular_project)} files, {pickled_size / 1e6:.1f} MB pickled, pickling takes {pickle_time * 1000:.1f} ms")
+            print(f"  {'workers':>7} {'write ms':>10} {'speed-up':>9} {'encode ms':>10} {'speed-up':>9}")
+
+            baseline = None
+            for workers in workers_list:
+                # Force the pool for every worker count above 1, whatever the size threshold says.
+                threshold = thunkd.PARALLEL_WRITE_BYTES_PER_WORKER
+                thunkd.PARALLEL_WRITE_BYTES_PER_WORKER = 0
+                try:
+                    write_time = timeIt(lambda: thunkd.write_modular_project(out_dir, modular_project, workers=workers), args.repeat)
+                    encode_time = timeIt(lambda: thunkd.encode_modular_project(modular_project, workers=workers), args.repeat)
+                finally:
+                    thunkd.PARALLEL_WRITE_BYTES_PER_WORKER = threshold
+                if baseline is None:
+                    baseline = (write_time, encode_time)
+                print(f"  {workers:>7} {write_time * 1000:>10.1f} {baseline[0] / write_time:>8.2f}x"
+                      f" {encode_time * 1000:>10.1f} {baseline[1] / encode_time:>8.2f}x")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import json
+import hashlib
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# The number of assets downloaded at the same time.
+MAX_DOWNLOAD_WORKERS = 8
+
+# The size of each chunk read from an asset download.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# The repository directory that mirrored assets are committed to.
+REPO_ASSETS_DIR = 'assets'
+
+_index_lock = threading.Lock()
+
+def getAssetStorePath():
+    """
+    Returns the path to the local content-addressed asset store. The store is shared by every project
+    pulled from this directory, so identical files are only ever kept once.
+    """
+    return Path.cwd() / 'asset_store'
+
+def getAssetObjectPath(digest):
+    """
+    Returns the path of an asset in the store given its SHA-256 digest.
+
+    Args:
+        digest (str): The SHA-256 hex digest of the asset content.
+
+    Returns:
+        Path: The path to the stored asset.
+    """
+    return getAssetStorePath() / 'objects' / digest[:2] / digest
+
+def loadAssetIndex():
+    """
+    Loads the asset index, which maps each asset URL to the digest and extension of its content.
+
+    Returns:
+        dict: The asset index, or an empty dict if there is none yet.
+    """
+    index_path = getAssetStorePath() / 'index.json'
+    if not index_path.exists():
+        return {}
+    with open(index_path) as f:
+        return json.load(f)
+
+def saveAssetIndex(index):
+    """
+    Saves the asset index to the store.
+
+    Args:
+        index (dict): The asset index.
+
+    Returns:
+        None
+    """
+    store_path = getAssetStorePath()
+    store_path.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_path / 'index.json.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=4)
+    tmp_path.replace(store_path / 'index.json')
+
+def collectAssetURLs(project):
+    """
+    Collects every asset URL referenced by a project, including the assets of its modules.
+
+    Args:
+        project (dict): The Thunkable project (as written to meta.json).
+
+    Returns:
+        list: The sorted, de-duplicated asset URLs.
+    """
+    iproject = project['data']['project']
+    sources = [iproject.get('assets')]
+    for module in iproject.get('modules') or []:
+        sources.append(module.get('assets'))
+
+    urls = set()
+    stack = sources
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, str) and value.startswith(('http://', 'https://')):
+            urls.add(value)
+    return sorted(urls)
+
+def downloadAsset(session, url):
+    """
+    Streams an asset into the store, hashing it on the way. If the store already holds identical content,
+    the downloaded copy is dropped.
+
+    Args:
+        session (requests.Session): The session used to download the asset.
+        url (str): The asset URL.
+
+    Returns:
+        str: The SHA-256 hex digest of the asset content.
+    """
+    objects_path = getAssetStorePath() / 'objects'
+    objects_path.mkdir(parents=True, exist_ok=True)
+
+    sha = hashlib.sha256()
+    with session.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        with tempfile.NamedTemporaryFile(dir=objects_path, delete=False) as f:
+            tmp_path = Path(f.name)
+            try:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    sha.update(chunk)
+                    f.write(chunk)
+            except BaseException:
+                # Drop the partial download, e.g. after a connection reset. It is closed first, as Windows cannot
+                # delete an open file.
+                f.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+    digest = sha.hexdigest()
+    object_path = getAssetObjectPath(digest)
+    if object_path.exists():
+        tmp_path.unlink()
+    else:
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.replace(object_path)
+    return digest
+
+def syncAssets(project_path, session=None):
+    """
+    Mirrors every asset referenced by the pulled project in project_path into the local store (see syncProjectAssets).
+
+    Args:
+        project_path (Path): The directory holding the pulled project's meta.json.
+        session (requests.Session): Optional session to reuse for the downloads.
+
+    Returns:
+        dict: A manifest mapping each asset URL to its repository path, e.g. "assets/<sha256>.png".
+    """
+    with open(Path(project_path) / 'meta.json') as f:
+        project = json.load(f)
+    return syncProjectAssets(project, session)
+
+def syncProjectAssets(project, session=None):
+    """
+    Mirrors every asset referenced by a project into the local store.
+    Assets whose URL is already indexed and whose content is still in the store are not fetched again.
+
+    Args:
+        project (dict): The Thunkable project (as in meta.json).
+        session (requests.Session): Optional session to reuse for the downloads.
+
+    Returns:
+        dict: A manifest mapping each asset URL to its repository path, e.g. "assets/<sha256>.png".
+    """
+    urls = collectAssetURLs(project)
+    index = loadAssetIndex()
+    missing = [url for url in urls if url not in index or not getAssetObjectPath(index[url]['sha256']).exists()]
+
+    if missing:
+        owns_session = session is None
+        if owns_session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=MAX_DOWNLOAD_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+        def fetch(url):
+            try:
+                digest = downloadAsset(session, url)
+            except requests.RequestException as e:
+                print(f"Failed to download asset {url}: {e}")
+                return
+            with _index_lock:
+                index[url] = {'sha256': digest, 'ext': Path(urlparse(url).path).suffix.lower()}
+
+        try:
+            with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+                list(executor.map(fetch, missing))
+        finally:
+            if owns_session:
+                session.close()
+
+        # Merge with the index on disk, which another sync may have updated in the meantime.
+        with _index_lock:
+            merged_index = loadAssetIndex()
+            merged_index.update(index)
+            saveAssetIndex(merged_index)
+
+    print(f"Synced {len(urls)} assets ({len(missing)} fetched).")
+    return {
+        url: f"{REPO_ASSETS_DIR}/{index[url]['sha256']}{index[url]['ext']}"
+        for url in urls if url in index
+    }
+
+def getGitBlobSha(content_bytes):
+    """
+    Computes the SHA git would give a blob with the given content, so unchanged files can be detected
+    without uploading them.
+
+    Args:
+        content_bytes (bytes): The blob content.
+
+    Returns:
+        str: The git blob SHA-1 hex digest.
+    """
+    header = f"blob {len(content_bytes)}\0".encode()
+    return hashlib.sha1(header + content_bytes).hexdigest()
@@ -0,0 +1,194 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import argparse
+import requests
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from github import InputGitTreeElement, InputGitAuthor, GithubException
+from thunkd.thunkd import fetch_project, list_snapshots, snapshot_timestamp, to_clean_project, to_modular_project, encode_modular_project
+import Utils
+import Config
+import Assets
+
+# The commit message trailer that records which snapshot a commit was imported from.
+SNAPSHOT_TRAILER = 'Thunkable-Snapshot'
+
+def getBackfillBranchName(project_id):
+    """
+    Returns the default name of the branch the snapshot history of a project is imported into.
+    """
+    return f"thunkable-history-{project_id}"
+
+def getSnapshotKey(snapshot):
+    """
+    Returns the value that identifies a snapshot across runs.
+    """
+    return snapshot.get('archiveFilename') or (snapshot.get('snapshot') or {}).get('id') or str(snapshot.get('createdAt'))
+
+def getImportedSnapshotKey(commit_message):
+    """
+    Returns the snapshot key recorded in a commit message, or None if the commit was not imported from a snapshot.
+    """
+    for line in reversed(commit_message.splitlines()):
+        if line.startswith(f"{SNAPSHOT_TRAILER}: "):
+            return line[len(SNAPSHOT_TRAILER) + 2:].strip()
+    return None
+
+def fetchSnapshotFiles(project_id, snapshot, session):
+    """
+    Fetches a snapshot and converts it to the files that are committed to the "src" directory.
+
+    Args:
+        project_id (str): The Thunkable project ID.
+        snapshot (dict): The snapshot metadata (see list_snapshots).
+        session (requests.Session): The session used for the request.
+
+    Returns:
+        dict: A mapping from file name to file content (bytes).
+    """
+    archive_filename = None if snapshot.get('isCurrentVersion') else snapshot.get('archiveFilename')
+    project = fetch_project(project_id=project_id, archive_filename=archive_filename, session=session)
+    modular_project = to_modular_project(project=to_clean_project(project=project))
+    # Snapshots are already fetched and encoded on a thread pool, so each one is encoded serially.
+    return encode_modular_project(modular_project=modular_project, workers=1)
+
+def buildSnapshotCommitMessage(snapshot):
+    title = snapshot.get('title') or 'Untitled snapshot'
+    return f"{title}\n\n{SNAPSHOT_TRAILER}: {getSnapshotKey(snapshot)}"
+
+def buildSnapshotAuthor(snapshot):
+    username = (snapshot.get('creator') or {}).get('username') or 'Thunkable'
+    date = datetime.fromtimestamp(snapshot_timestamp(snapshot), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return InputGitAuthor(username, 'noreply@thunkable.com', date)
+
+def backfill(github, repo_name, project_id, branch_name=None, workers=4):
+    """
+    Imports every snapshot of a Thunkable project as a chronological chain of commits on a branch.
+
+    Snapshots are fetched concurrently, at most `workers` ahead of the commit being created. Each commit reuses
+    the tree of the previous one and only uploads the files that changed. Every commit records its snapshot in
+    a trailer, so a re-run continues after the last imported snapshot.
+
+    Args:
+        github (Github): An instance of the Github class for authentication.
+        repo_name (str): The name of the repository.
+        project_id (str): The Thunkable project ID.
+        branch_name (str): The branch to import into, defaults to getBackfillBranchName(project_id).
+        workers (int): The number of snapshots fetched at the same time.
+
+    Returns:
+        int: The number of imported snapshots.
+    """
+    repo = Utils.getRepository(github, repo_name)
+    if repo is None:
+        print(f"Repository '{repo_name}' not found.")
+        return 0
+
+    branch_name = branch_name or getBackfillBranchName(project_id)
+    session = requests.Session()
+    try:
+        snapshots = list_snapshots(fetch_project(project_id=project_id, session=session))
+
+        # Continue from the head of the branch if it exists, otherwise start from the main branch.
+        try:
+            ref = repo.get_git_ref(f"heads/{branch_name}")
+            parent = repo.get_git_commit(ref.object.sha)
+            imported_key = getImportedSnapshotKey(parent.message)
+            keys = [getSnapshotKey(snapshot) for snapshot in snapshots]
+            if imported_key in keys:
+                snapshots = snapshots[keys.index(imported_key) + 1:]
+        except GithubException:
+            ref = None
+            parent = repo.get_git_commit(repo.get_branch(Config.getConfig().github_main_branch_name).commit.sha)
+
+        print(f"Importing {len(snapshots)} snapshot(s) into '{branch_name}'.")
+        previous = {item.path: item.sha for item in Utils.getSrcTreeItems(repo, parent.tree.sha)}
+
+        imported = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            remaining = iter(snapshots)
+            pending = deque()
+            for snapshot in remaining:
+                pending.append((snapshot, executor.submit(fetchSnapshotFiles, project_id, snapshot, session)))
+                if len(pending) >= workers:
+                    break
+
+            while pending:
+                snapshot, future = pending.popleft()
+                files = future.result()
+                next_snapshot = next(remaining, None)
+                if next_snapshot is not None:
+                    pending.append((next_snapshot, executor.submit(fetchSnapshotFiles, project_id, next_snapshot, session)))
+
+                # Only upload the files that differ from the previous commit.
+                shas = {name: Assets.getGitBlobSha(content) for name, content in files.items()}
+                elements = [
+                    InputGitTreeElement(path=f"src/{name}", mode='100644', type='blob', content=files[name].decode('utf-8'))
+                    for name in files if previous.get(name) != shas[name]
+                ]
+                elements.extend(
+                    InputGitTreeElement(path=f"src/{name}", mode='100644', type='blob', sha=None)
+                    for name in previous if name not in files
+                )
+
+                tree = repo.create_git_tree(tree=elements, base_tree=parent.tree) if elements else parent.tree
+                author = buildSnapshotAuthor(snapshot)
+                commit = repo.create_git_commit(message=buildSnapshotCommitMessage(snapshot), tree=tree, parents=[parent], author=author)
+
+                # Move the branch after every commit, so an interrupted run can be resumed.
+                if ref is None:
+                    ref = repo.create_git_ref(ref=f"refs/heads/{branch_name}", sha=commit.sha)
+                else:
+                    ref.edit(sha=commit.sha)
+
+                print(f"Imported snapshot '{snapshot.get('title')}' ({len(elements)} file(s) changed).")
+                parent, previous = commit, shas
+                imported += 1
+        return imported
+    finally:
+        session.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Backfill",
+        description="Import the snapshot history of a Thunkable project as a chain of commits."
+    )
+    parser.add_argument("project", help="Thunkable project ID or project site URL.")
+    parser.add_argument("--branch", default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    if Config.isConfigDataMissing():
+        print("Please fill in all fields in the config.json file.")
+        sys.exit(1)
+    github = Utils.authenticateWithGithub()
+    if github is None:
+        sys.exit(1)
+    project_id = Utils.getProjectIDFromURL(args.project) if "/" in args.project else args.project
+    backfill(github, Config.getConfig().github_repo_name, project_id, args.branch, args.workers)
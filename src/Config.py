@@ -0,0 +1,220 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from dataclasses import dataclass, fields
+
+# Every config.json key can be overridden by an environment variable of the same name with this prefix,
+# e.g. THUNKABLE_SYNC_GITHUB_AUTH_TOKEN.
+ENV_PREFIX = 'THUNKABLE_SYNC_'
+
+# The environment variable that points at a different config file.
+CONFIG_PATH_ENV = ENV_PREFIX + 'CONFIG'
+
+# The keys that must be filled in before anything can be pushed or pulled.
+REQUIRED_KEYS = ('MAIN_APP_THUNKABLE_SITE_URL', 'THUNKABLE_TOKEN', 'GITHUB_AUTH_TOKEN', 'GITHUB_REPO_NAME', 'GITHUB_MAIN_BRANCH_NAME')
+
+# The accepted values of the keys that select a mode.
+CHOICES = {
+    'GITHUB_BACKEND': ('api', 'git'),
+    'PUSH_MODE': ('project', 'modules'),
+    'PULL_MODE': ('memory', 'stream'),
+}
+
+# The default config file, next to the application.
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / 'config.json'
+
+class ConfigError(Exception):
+    """
+    Raised when the config file cannot be read or holds an invalid value.
+    """
+
+@dataclass(frozen=True)
+class Config:
+    """
+    The validated application config. Each field is read from the config.json key of the same name in upper case.
+    """
+
+    main_app_thunkable_site_url: str = ''
+    thunkable_token: str = ''
+    github_auth_token: str = ''
+    github_repo_name: str = ''
+    github_main_branch_name: str = 'main'
+    github_backend: str = 'api'
+    github_repo_url: str = ''
+    push_mode: str = 'project'
+    pull_mode: str = 'memory'
+    sync_service_url: str = ''
+    clean_paths: tuple = ()
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Builds a config from the content of a config file, checking the type and value of every known key.
+
+        Args:
+            data (dict): The config data, keyed by the config.json keys. Unknown keys are ignored.
+
+        Raises:
+            ConfigError: If a value has the wrong type or is not one of the accepted choices.
+
+        Returns:
+            Config: The config.
+        """
+        values = {}
+        for field in fields(cls):
+            key = field.name.upper()
+            if key not in data:
+                continue
+            value = data[key]
+
+            if key == 'CLEAN_PATHS':
+                if not isinstance(value, list) or not all(isinstance(path, (str, list)) for path in value):
+                    raise ConfigError(f"{key} must be a list of paths.")
+                # Paths given as lists of keys are joined, so the config stays hashable.
+                value = tuple(path if isinstance(path, str) else '/'.join(path) for path in value)
+            elif not isinstance(value, str):
+                raise ConfigError(f"{key} must be a string.")
+            elif key in CHOICES and value not in CHOICES[key]:
+                raise ConfigError(f"{key} must be one of {', '.join(CHOICES[key])}, not '{value}'.")
+            values[field.name] = value
+        return cls(**values)
+
+    def getMissingKeys(self):
+        """
+        Returns the required keys (see REQUIRED_KEYS) that are not filled in.
+        """
+        return [key for key in REQUIRED_KEYS if getattr(self, key.lower()) == '']
+
+# The config.json keys, in the order of the Config fields.
+CONFIG_KEYS = tuple(field.name.upper() for field in fields(Config))
+
+def getConfigPath():
+    """
+    Returns the path to the config file. It sits next to the application rather than in the current working directory,
+    unless another path is given in the THUNKABLE_SYNC_CONFIG environment variable.
+    """
+    path = os.environ.get(CONFIG_PATH_ENV)
+    return Path(path) if path else DEFAULT_CONFIG_PATH
+
+def getEnvironmentOverrides():
+    """
+    Returns the config values set by THUNKABLE_SYNC_<KEY> environment variables. CLEAN_PATHS is given as a JSON list
+    or as comma separated paths.
+    """
+    overrides = {}
+    for key in CONFIG_KEYS:
+        value = os.environ.get(ENV_PREFIX + key)
+        if value is None:
+            continue
+        if key == 'CLEAN_PATHS':
+            try:
+                value = json.loads(value) if value.lstrip().startswith('[') else [p.strip() for p in value.split(',') if p.strip()]
+            except json.JSONDecodeError as e:
+                raise ConfigError(f"{ENV_PREFIX + key} is not a valid JSON list: {e}")
+        overrides[key] = value
+    return overrides
+
+def loadConfig(path=None):
+    """
+    Reads and validates a config file, with the environment variable overrides applied on top. A missing file
+    is treated as empty, so a headless run can be configured through the environment alone.
+
+    Args:
+        path (Path): Optional config file, defaults to getConfigPath().
+
+    Raises:
+        ConfigError: If the file is not valid JSON or holds an invalid value.
+
+    Returns:
+        Config: The config.
+    """
+    path = Path(path) if path is not None else getConfigPath()
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path} is not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ConfigError(f"{path} must contain a JSON object.")
+
+    data.update(getEnvironmentOverrides())
+    return Config.fromDict(data)
+
+_lock = threading.Lock()
+_config = None
+_config_key = None
+
+def getConfigKey():
+    # The config only needs to be read again when the file changed. The size catches writes within the mtime resolution.
+    path = os.environ.get(CONFIG_PATH_ENV) or DEFAULT_CONFIG_PATH
+    try:
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return (path, None, None)
+
+def getConfig():
+    """
+    Returns the current config. It is loaded once and only read again when the config file's modification time
+    changes, so it is cheap to call wherever a value is needed. The environment overrides are read with the file.
+    If a changed file cannot be loaded, e.g. while an editor is still writing it, the error is printed and the last
+    valid config is kept until the file changes again.
+
+    Raises:
+        ConfigError: If the config has never been loaded and the config file is not valid JSON or holds an invalid value.
+
+    Returns:
+        Config: The config.
+    """
+    global _config, _config_key
+    key = getConfigKey()
+    with _lock:
+        if _config is None or key != _config_key:
+            try:
+                _config = loadConfig(key[0])
+            except ConfigError as e:
+                if _config is None:
+                    raise
+                print(f"Invalid config, keeping the previous one: {e}")
+            _config_key = key
+        return _config
+
+def isConfigDataMissing():
+    """
+    Checks if the config is invalid or if any of the required fields are missing.
+
+    Returns:
+        bool: True if the config is invalid or if any of the required fields are missing, False otherwise.
+    """
+    try:
+        return bool(getConfig().getMissingKeys())
+    except ConfigError as e:
+        print(f"Invalid config: {e}")
+        return True
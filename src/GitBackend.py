@@ -0,0 +1,247 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import json
+import base64
+import random
+import shutil
+import string
+import subprocess
+import threading
+from pathlib import Path
+import Utils
+from Config import getConfig
+import Assets
+
+# The identity used for commits when the local clone has none configured.
+DEFAULT_COMMITTER_NAME = 'Thunkable Github Sync'
+DEFAULT_COMMITTER_EMAIL = 'thunkable-github-sync@users.noreply.github.com'
+
+# The local clone has a single work tree, so only one operation may use it at a time.
+_clone_lock = threading.Lock()
+
+def getLocalClonePath():
+    """
+    Returns the path to the persistent local clone used by the git backend.
+    """
+    return Path.cwd() / 'repo_clone'
+
+def runGit(args, cwd=None, token=None, input=None):
+    """
+    Runs a git command and returns its standard output.
+
+    Args:
+        args (list): The git arguments, e.g. ['fetch', 'origin'].
+        cwd (Path): The directory to run the command in, defaults to the local clone.
+        token (str): Optional GitHub auth token, sent as an HTTP header. It is handed to git through the environment,
+            so it is neither stored in the remote URL nor visible on the command line in the process list.
+        input (bytes): Optional data written to the command's standard input.
+
+    Raises:
+        subprocess.CalledProcessError: If git exits with an error.
+
+    Returns:
+        bytes: The standard output of the command.
+    """
+    env = None
+    if token:
+        # GIT_CONFIG_COUNT/KEY/VALUE act like "-c" options, after any that are already set in the environment.
+        credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        env = os.environ.copy()
+        index = int(env.get('GIT_CONFIG_COUNT') or 0)
+        env['GIT_CONFIG_COUNT'] = str(index + 1)
+        env[f"GIT_CONFIG_KEY_{index}"] = 'http.extraHeader'
+        env[f"GIT_CONFIG_VALUE_{index}"] = f"Authorization: Basic {credentials}"
+    command = ['git'] + args
+    result = subprocess.run(command, cwd=cwd or getLocalClonePath(), input=input, capture_output=True, check=True, env=env)
+    return result.stdout
+
+def ensureLocalClone(remote_url, token=None):
+    """
+    Makes sure the persistent local clone exists and points at remote_url. The clone is created once
+    and only fetched afterwards, so every later sync transfers just the new objects.
+
+    Args:
+        remote_url (str): The URL or path of the remote repository.
+        token (str): Optional GitHub auth token.
+
+    Returns:
+        Path: The path to the local clone.
+    """
+    clone_path = getLocalClonePath()
+    if not (clone_path / '.git').exists():
+        clone_path.parent.mkdir(parents=True, exist_ok=True)
+        runGit(['clone', '--no-checkout', remote_url, str(clone_path)], cwd=clone_path.parent, token=token)
+    else:
+        runGit(['remote', 'set-url', 'origin', remote_url])
+
+    for key, value in [('user.name', DEFAULT_COMMITTER_NAME), ('user.email', DEFAULT_COMMITTER_EMAIL)]:
+        try:
+            runGit(['config', key])
+        except subprocess.CalledProcessError:
+            runGit(['config', key, value])
+    return clone_path
+
+def fetchMainBranch(remote_url, token=None):
+    """
+    Fetches the main branch from the remote into the local clone.
+
+    Args:
+        remote_url (str): The URL or path of the remote repository.
+        token (str): Optional GitHub auth token.
+
+    Returns:
+        str: The remote-tracking ref of the main branch, e.g. "origin/main".
+    """
+    ensureLocalClone(remote_url, token)
+    branch = getConfig().github_main_branch_name
+    runGit(['fetch', '--prune', 'origin', f"+refs/heads/{branch}:refs/remotes/origin/{branch}"], token=token)
+    return f"origin/{branch}"
+
+def createBranchAndCommit(remote_url, commitMessage, assets=None, out_dir=None, owner='local', token=None, files=None):
+    """
+    Creates a new branch from the main branch and commits all the files in the "out" directory to the "src"
+    directory, then pushes the branch with a single native git push.
+
+    Args:
+        remote_url (str): The URL or path of the remote repository.
+        commitMessage (str): The commit message for the new commit.
+        assets (dict): Optional asset manifest (see Assets.syncAssets) whose assets are committed to the "assets" directory.
+        out_dir (Path): Optional directory to commit instead of the "out" directory.
+        owner (str): The repository owner, used in the branch name.
+        token (str): Optional GitHub auth token.
+        files (dict): Optional mapping from file name to file content (bytes) to commit instead of reading a directory.
+
+    Returns:
+        str: The name of the new branch, or None if it could not be created.
+    """
+    try:
+        with _clone_lock:
+            return commitToNewBranch(remote_url, commitMessage, assets, out_dir, owner, token, files)
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to create branch and submit commit in repository '{remote_url}': {e.stderr.decode(errors='replace')}")
+        return None
+
+def commitToNewBranch(remote_url, commitMessage, assets, out_dir, owner, token, files):
+    """
+    The body of createBranchAndCommit, run while holding the clone lock.
+    """
+    source_ref = fetchMainBranch(remote_url, token)
+    clone_path = getLocalClonePath()
+
+    # Generate a 4-letter unique ID
+    unique_id = ''.join(random.choices(string.ascii_lowercase, k=4))
+
+    # Create the branch name
+    branch_name = f"{owner}-devbranch-{unique_id}"
+
+    runGit(['checkout', '--force', '-B', branch_name, source_ref])
+    runGit(['clean', '-fdq', '--', 'src', Assets.REPO_ASSETS_DIR])
+
+    # Copy all the files in the "out" directory (or the in-memory files) to the "src" directory in the branch
+    src_path = clone_path / 'src'
+    src_path.mkdir(exist_ok=True)
+    if files is not None:
+        for file, content_bytes in files.items():
+            (src_path / file).write_bytes(content_bytes)
+    else:
+        out_dir = Path(out_dir) if out_dir is not None else Utils.getOutDirPath()
+        for file in os.listdir(out_dir):
+            shutil.copyfile(out_dir / file, src_path / file)
+    paths = ['src']
+
+    if assets:
+        assets_path = clone_path / Assets.REPO_ASSETS_DIR
+        assets_path.mkdir(exist_ok=True)
+        for repo_path in sorted(set(assets.values())):
+            # Asset file names are content hashes, so an existing file never needs to be copied again.
+            if not (clone_path / repo_path).exists():
+                shutil.copyfile(Assets.getAssetObjectPath(Path(repo_path).stem), clone_path / repo_path)
+        with open(assets_path / 'manifest.json', 'w') as f:
+            f.write(json.dumps(assets, indent=4, sort_keys=True))
+        paths.append(Assets.REPO_ASSETS_DIR)
+
+    runGit(['add', '--'] + paths)
+    runGit(['commit', '--allow-empty', '-m', commitMessage])
+    runGit(['push', 'origin', f"refs/heads/{branch_name}:refs/heads/{branch_name}"], token=token)
+
+    print(f"Branch '{branch_name}' updated with new commit successfully.")
+    return branch_name
+
+def downloadFilesFromMainBranch(remote_url, out_dir=None, token=None):
+    """
+    Downloads the .json and .xml files from the 'src' directory of the main branch into the "out" directory,
+    reading them straight from the local clone's object database after a fetch. Files that are already up to date
+    are left untouched and files that are no longer in 'src' are removed.
+
+    Args:
+        remote_url (str): The URL or path of the remote repository.
+        out_dir (Path): Optional directory to download into instead of the "out" directory.
+        token (str): Optional GitHub auth token.
+
+    Returns:
+        None
+    """
+    try:
+        # Resolve the fetched commit while holding the lock, so a concurrent fetch cannot move it under us.
+        with _clone_lock:
+            source_ref = runGit(['rev-parse', fetchMainBranch(remote_url, token)]).decode().strip()
+        out_dir = Path(out_dir) if out_dir is not None else Utils.getOutDirPath()
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        # List the blobs in 'src', each entry is "<mode> <type> <sha>\t<path>".
+        entries = []
+        for line in runGit(['ls-tree', '-r', '-z', source_ref, '--', 'src/']).split(b'\0'):
+            if not line:
+                continue
+            info, path = line.split(b'\t', 1)
+            path = path.decode()
+            if info.split()[1] == b'blob' and (path.endswith('.json') or path.endswith('.xml')):
+                entries.append((info.split()[2].decode(), path))
+
+        # Only read the blobs that differ from what is already in the "out" directory, and drop the files that are
+        # no longer in 'src', as the REST download does.
+        changed_entries = [(sha, path) for sha, path in entries
+                           if not Utils.isLocalFileUpToDate(out_dir / path[len('src/'):], sha)]
+        Utils.removeStaleLocalFiles(out_dir, {path[len('src/'):] for _, path in entries})
+        print(f"{len(changed_entries)} of {len(entries)} files changed.")
+
+        # Read every changed blob with a single cat-file process.
+        output = runGit(['cat-file', '--batch'], input=''.join(f"{sha}\n" for sha, _ in changed_entries).encode())
+        offset = 0
+        for sha, path in changed_entries:
+            header_end = output.index(b'\n', offset)
+            size = int(output[offset:header_end].split()[2])
+            content = output[header_end + 1:header_end + 1 + size]
+            offset = header_end + 1 + size + 1
+
+            print(f"Downloading file: {path}")
+            file_path = out_dir / path[len('src/'):]
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(content)
+
+        print("Files from 'src' directory downloaded successfully.")
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to download files from 'src' directory: {e.stderr.decode(errors='replace')}")
@@ -0,0 +1,235 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+# The largest total size of the cached response bodies, in bytes. The least recently used entries are evicted first.
+MAX_CACHE_SIZE = 64 * 1024 * 1024
+
+# Headers of a cached response that no longer describe the stored (already decoded) body.
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+def getGithubCachePath():
+    """
+    Returns the path to the on-disk cache of GitHub API responses.
+    """
+    return Path.cwd() / 'github_cache.sqlite3'
+
+class ResponseCache:
+    """
+    An on-disk, size-bounded LRU store of HTTP responses with their validators (ETag and Last-Modified).
+    """
+
+    def __init__(self, path, max_size=MAX_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, headers TEXT, body BLOB, size INTEGER, last_used REAL)"
+        )
+        self.db.commit()
+
+    def get(self, key):
+        """
+        Looks up a cached response and marks it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple: The ETag, Last-Modified, headers and body of the response, or None if it is not cached.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        etag, last_modified, headers, body = row
+        return etag, last_modified, json.loads(headers), body
+
+    def put(self, key, etag, last_modified, headers, body):
+        """
+        Stores a response, evicting the least recently used responses if the cache grows too large.
+
+        Args:
+            key (str): The cache key.
+            etag (str): The ETag of the response, or None.
+            last_modified (str): The Last-Modified date of the response, or None.
+            headers (dict): The response headers.
+            body (bytes): The response body.
+
+        Returns:
+            None
+        """
+        if len(body) > self.max_size:
+            return
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, json.dumps(headers), body, len(body), time.time()),
+            )
+            total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            while total_size > self.max_size:
+                oldest = self.db.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                self.db.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+                total_size -= oldest[1]
+            self.db.commit()
+
+class ConditionalRequestAdapter(HTTPAdapter):
+    """
+    A requests adapter that revalidates cached GET responses with If-None-Match and If-Modified-Since
+    instead of fetching them again. A 304 answer is turned back into the cached 200 response, with the
+    fresh headers (such as the rate limit) of the 304 applied on top.
+    """
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    @staticmethod
+    def getCacheKey(request):
+        # Responses differ per user and per media type, so both are part of the key. Only a hash of the token is kept.
+        authorization = request.headers.get('Authorization', '')
+        parts = [request.url, request.headers.get('Accept', ''), hashlib.sha256(authorization.encode()).hexdigest()]
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = self.getCacheKey(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            etag, last_modified, _, _ = cached
+            if etag:
+                request.headers['If-None-Match'] = etag
+            if last_modified:
+                request.headers['If-Modified-Since'] = last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            # Read the (empty) body so the connection goes back to the pool and is reused by the next request.
+            response.content
+            _, _, headers, body = cached
+            headers.update({k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS})
+            return self.buildCachedResponse(request, response, headers, body)
+
+        if response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+                self.cache.put(key, etag, last_modified, headers, response.content)
+        return response
+
+    @staticmethod
+    def buildCachedResponse(request, not_modified, headers, body):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = not_modified.connection
+        response.elapsed = not_modified.elapsed
+        return response
+
+_cache = None
+
+def mountConditionalRequestAdapter(connection, prefix):
+    connection.adapter = ConditionalRequestAdapter(
+        _cache,
+        max_retries=connection.retry,
+        pool_connections=connection.pool_size,
+        pool_maxsize=connection.pool_size,
+    )
+    connection.session.mount(prefix, connection.adapter)
+
+class CachingHTTPSRequestsConnection(HTTPSRequestsConnectionClass):
+    """
+    The HTTPS connection PyGithub uses, with the conditional request adapter mounted in place of the default one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        mountConditionalRequestAdapter(self, 'https://')
+
+class CachingHTTPRequestsConnection(HTTPRequestsConnectionClass):
+    """
+    The plain HTTP connection PyGithub uses for an http:// base URL, with the conditional request adapter mounted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        mountConditionalRequestAdapter(self, 'http://')
+
+_CACHING_CONNECTION_CLASSES = {
+    HTTPSRequestsConnectionClass: CachingHTTPSRequestsConnection,
+    HTTPRequestsConnectionClass: CachingHTTPRequestsConnection,
+}
+
+def installGithubCache(github, path=None, max_size=MAX_CACHE_SIZE):
+    """
+    Routes the requests of a Github instance through the on-disk conditional request cache.
+    Unchanged users, branches, trees and commits are then answered with 304s, which do not count against the rate limit.
+
+    Only the connection class of this instance's requester is replaced. Requester.injectConnectionClasses is not used,
+    because it also turns off PyGithub's persistent connection, so every call would open a new TCP/TLS connection.
+
+    Args:
+        github (Github): The Github instance, before it has sent any request.
+        path (Path): Optional path of the cache file, defaults to getGithubCachePath().
+        max_size (int): The largest total size of the cached responses, in bytes.
+
+    Returns:
+        Github: The same Github instance.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(path or getGithubCachePath(), max_size)
+
+    requester = github.requester
+    connection_class = requester._Requester__connectionClass
+    requester._Requester__connectionClass = _CACHING_CONNECTION_CLASSES.get(connection_class, connection_class)
+    return github
@@ -25,8 +25,10 @@ SOFTWARE.
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton
 from PyQt5.QtCore import Qt
-from thunkd.thunkd import pull, push, getThunkableToken
 import Utils
+import Config
+import Service
+import requests
 from PyQt5.QtWidgets import QGridLayout
 import os
 
@@ -41,6 +43,12 @@ class MyApp(QWidget):
 
         layout = QGridLayout()
 
+        # An invalid config is reported when a button is clicked, until then every field is shown as missing.
+        try:
+            config = Config.getConfig()
+        except Config.ConfigError:
+            config = Config.Config()
+
         self.label_title = QLabel('Thunkable Github Sync', self)
         self.label_title.setStyleSheet("font-size: 18px; font-weight: bold")  # Increase the font size and add bold
         layout.addWidget(self.label_title, 0, 0)
@@ -55,29 +63,29 @@ class MyApp(QWidget):
         
         self.label_main_app_thunkable_site_url_valid = QLabel("Main App URL: Please add your app url to config.json", self)
         self.label_main_app_thunkable_site_url_valid.setStyleSheet("font-size: 14px; color: red")  # Increase the font size
-        if Utils.getMainAppThunkableSiteURL() != "":
-            self.label_main_app_thunkable_site_url_valid.setText("Main App URL: " + Utils.getMainAppThunkableSiteURL()[:5] + "***")  # Add a missing comma between the string and the function call
+        if config.main_app_thunkable_site_url != "":
+            self.label_main_app_thunkable_site_url_valid.setText("Main App URL: " + config.main_app_thunkable_site_url[:5] + "***")  # Add a missing comma between the string and the function call
             self.label_main_app_thunkable_site_url_valid.setStyleSheet("font-size: 14px; color: green")  # Increase the font size
         layout.addWidget(self.label_main_app_thunkable_site_url_valid, 3, 0)
 
         self.label_thunk_token_valid = QLabel("Thunk Token: Please add your thunk token to config.json", self)
         self.label_thunk_token_valid.setStyleSheet("font-size: 14px; color: red")  # Increase the font size
-        if getThunkableToken() != "":
-            self.label_thunk_token_valid.setText("Thunk Token: " + getThunkableToken()[:5] + "***")  # Add a missing comma between the string and the function call
+        if config.thunkable_token != "":
+            self.label_thunk_token_valid.setText("Thunk Token: " + config.thunkable_token[:5] + "***")  # Add a missing comma between the string and the function call
             self.label_thunk_token_valid.setStyleSheet("font-size: 14px; color: green")  # Increase the font size
         layout.addWidget(self.label_thunk_token_valid, 4, 0)
 
         self.label_github_auth_token_valid = QLabel("Github Auth Token: Please add your github auth token to config.json", self)
         self.label_github_auth_token_valid.setStyleSheet("font-size: 14px; color: red")  # Increase the font size
-        if Utils.getGithubAuthToken() != "":
-            self.label_github_auth_token_valid.setText("Github Token: " + Utils.getGithubAuthToken()[:5] + "***")  # Add a missing comma between the string and the function call
+        if config.github_auth_token != "":
+            self.label_github_auth_token_valid.setText("Github Token: " + config.github_auth_token[:5] + "***")  # Add a missing comma between the string and the function call
             self.label_github_auth_token_valid.setStyleSheet("font-size: 14px; color: green")  # Increase the font size
         layout.addWidget(self.label_github_auth_token_valid, 5, 0)
 
         self.label_github_repo_name_valid = QLabel("Github Repo Name: Please add your github repo name to config.json", self)
         self.label_github_repo_name_valid.setStyleSheet("font-size: 14px; color: red")  # Increase the font size
-        if Utils.getGithubRepoName() != "":
-            self.label_github_repo_name_valid.setText("Github Repo Name: " + Utils.getGithubRepoName())  # Add a missing comma between the string and the function call
+        if config.github_repo_name != "":
+            self.label_github_repo_name_valid.setText("Github Repo Name: " + config.github_repo_name)  # Add a missing comma between the string and the function call
             self.label_github_repo_name_valid.setStyleSheet("font-size: 14px; color: green")  # Increase the font size
         layout.addWidget(self.label_github_repo_name_valid, 6, 0)
 
@@ -159,6 +167,30 @@ class MyApp(QWidget):
             self.label_status_message_description.setStyleSheet("font-size: 14px; text-align: center; margin-bottom: 10px; color: #b45309")
             self.label_status_message_description.setText(text)
 
+    def runServiceJob(self, job):
+        """
+        Submits a job to the sync service and shows its progress in the status message until it finishes.
+
+        Args:
+            job (dict): The job, e.g. {"type": "push"}.
+
+        Returns:
+            None
+        """
+        service_url = Config.getConfig().sync_service_url
+        try:
+            job_id = Service.submitJob(service_url, job)["id"]
+            for event in Service.streamJobEvents(service_url, job_id):
+                if event["state"] == "succeeded":
+                    self.updateStatusMessage("success", event["message"])
+                elif event["state"] == "failed":
+                    self.updateStatusMessage("error", event["message"])
+                else:
+                    self.updateStatusMessage("working", event["message"])
+                QApplication.processEvents()
+        except requests.RequestException as e:
+            self.updateStatusMessage("error", f"Failed to reach the sync service: {e}")
+
     def buttonDownloadAndCommitSubmitClicked(self):
         """
         Downloads all files from the dev branch to the "out" directory,
@@ -177,7 +209,7 @@ class MyApp(QWidget):
         None
         """
         
-        if Utils.isConfigDataMissing():
+        if Config.isConfigDataMissing():
             self.updateStatusMessage("error", "Please fill in all fields in the config.json file.")
             return
         
@@ -195,16 +227,16 @@ class MyApp(QWidget):
         # Get the project ID from the URL
         devProjectID = Utils.getProjectIDFromURL(thunkable_site_url_dev)
         
+        # Let the sync service do the work if one is configured
+        if Config.getConfig().sync_service_url != "":
+            self.runServiceJob({"type": "pull", "project_id": devProjectID, "commit_message": github_commit_message})
+            return
+        
         # Authenticate with Github
         github = Utils.authenticateWithGithub()
         
-        # Download all files from the dev thunkable app to the "out" directory
-        pull(devProjectID, Utils.getOutDirPath(), True, True)
-
-        Utils.setProjectNameInMetaDataFile(Utils.getGithubRepoName() + " - Main App" + " (" + github_commit_message + ")")
-
-        # Create a new branch and commit the files (location: root/src)
-        Utils.createBranchAndCommit(github, Utils.getGithubRepoName(), github_commit_message)
+        # Download the dev thunkable app and commit it to a new branch (location: root/src)
+        Utils.runPullAndCommit(github, devProjectID, github_commit_message)
         self.updateStatusMessage("success", "Successfully Created Branch and Committed Files, Completed!")
         
     def buttonUpdateMainThunkableAppSubmitClicked(self):
@@ -224,22 +256,20 @@ class MyApp(QWidget):
             None
         """
         
-        if Utils.isConfigDataMissing():
+        if Config.isConfigDataMissing():
             self.updateStatusMessage("error", "Please fill in all fields in the config.json file.")
             return
         
+        # Let the sync service do the work if one is configured
+        if Config.getConfig().sync_service_url != "":
+            self.runServiceJob({"type": "push"})
+            return
+        
         # Authenticate with Github
         github = Utils.authenticateWithGithub()
         
-        # Download all files from the main branch to the "out" directory
-        Utils.downloadFilesFromMainBranch(github, Utils.getGithubRepoName())
-        print("Downloaded files from the main branch.")
-        
-        # Get main app project ID
-        mainProjectID = Utils.getProjectIDFromURL(Utils.getMainAppThunkableSiteURL())
-        
-        # Push the downloaded files from main branch to the main app in thunkable
-        push(mainProjectID, Utils.getOutDirPath(), True)
+        # Download all files from the main branch and push them to the main app in thunkable
+        Utils.runDownloadAndPush(github)
         print("Success, pushed main branch files to main thunkable app.")
         self.updateStatusMessage("success", "Successfully Pushed Main Branch Files to Main Thunkable App.")
 
@@ -0,0 +1,348 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import threading
+import requests
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import Utils
+import Config
+
+# The default port of the sync service. It only listens on localhost.
+DEFAULT_PORT = 8750
+
+# The job types accepted by the service.
+JOB_TYPES = ('pull', 'push')
+
+# How long a finished job can still be looked up by its clients, in seconds. Older finished jobs are forgotten.
+JOB_RETENTION = 60 * 60
+
+class Job:
+    """
+    A push or pull job, with the progress events clients can stream while it runs.
+    """
+
+    def __init__(self, job_type, project_id, params):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.project_id = project_id
+        self.params = params
+        self.state = 'queued'
+        self.result = None
+        self.finished_at = None
+        self.events = []
+        self.condition = threading.Condition()
+        self.report("Queued.")
+
+    @property
+    def done(self):
+        return self.state in ('succeeded', 'failed')
+
+    def report(self, message, state=None, result=None):
+        """
+        Records a progress event and wakes up the clients streaming this job.
+
+        Args:
+            message (str): A short description of the progress.
+            state (str): Optional new job state.
+            result: Optional job result, set when the job finishes.
+
+        Returns:
+            None
+        """
+        with self.condition:
+            if state is not None:
+                self.state = state
+                if self.done:
+                    self.finished_at = time.monotonic()
+            if result is not None:
+                self.result = result
+            self.events.append({'state': self.state, 'message': message})
+            self.condition.notify_all()
+
+    def toDict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'project_id': self.project_id,
+            'commit_message': self.params.get('commit_message'),
+            'state': self.state,
+            'result': self.result,
+            'events': list(self.events),
+        }
+
+class SyncService:
+    """
+    Runs push and pull jobs on a worker pool. Identical jobs (same type, project and branch, and the same commit message
+    for a pull) that are queued or running are coalesced, so clients asking for the same sync share one job. The Github client, the HTTP session and the
+    working directories are shared by all jobs, so the caches built by one client's sync benefit the next.
+    """
+
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.active = {}
+        self.github = None
+
+    def getGithub(self):
+        with self.lock:
+            if self.github is None:
+                self.github = Utils.authenticateWithGithub()
+            return self.github
+
+    def getJobKey(self, job_type, project_id, params):
+        # A pull always commits to a new branch from the dev project under its own commit message, so only pulls with
+        # the same message are identical. A push always targets the main branch.
+        if job_type == 'pull':
+            return (job_type, project_id, None, params['commit_message'])
+        return (job_type, project_id, Config.getConfig().github_main_branch_name, None)
+
+    def getWorkDirPath(self, job):
+        """
+        Returns the working directory of a job. Identical jobs never run at the same time, so pushes of the same
+        project reuse one directory, which lets incremental downloads skip unchanged files. Pulls of the same project
+        with different commit messages can run at the same time, so each streaming pull gets its own directory.
+        """
+        if job.type == 'pull':
+            return Path.cwd() / 'service' / f"pull-{job.id}"
+        return Path.cwd() / 'service' / f"{job.type}-{job.project_id}"
+
+    def getJob(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def evictFinishedJobs(self):
+        # Called with the lock held, on every submit, so a long-running service only keeps the recent jobs.
+        now = time.monotonic()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and now - job.finished_at >= JOB_RETENTION:
+                del self.jobs[job_id]
+
+    def submit(self, job_type, project_id, params):
+        """
+        Queues a job, or returns the identical job that is already queued or running.
+
+        Args:
+            job_type (str): "pull" or "push".
+            project_id (str): The Thunkable project ID.
+            params (dict): The job parameters, e.g. the commit message of a pull.
+
+        Returns:
+            tuple: The job and whether it was coalesced with an existing job.
+        """
+        key = self.getJobKey(job_type, project_id, params)
+        with self.lock:
+            self.evictFinishedJobs()
+            if key in self.active:
+                return self.active[key], True
+            job = Job(job_type, project_id, params)
+            self.jobs[job.id] = job
+            self.active[key] = job
+        self.executor.submit(self.run, job, key)
+        return job, False
+
+    def run(self, job, key):
+        try:
+            job.report("Started.", state='running')
+            github = self.getGithub()
+            if github is None:
+                job.report("Failed to authenticate with Github.", state='failed')
+                return
+
+            out_dir = self.getWorkDirPath(job)
+            out_dir.parent.mkdir(parents=True, exist_ok=True)
+            if job.type == 'pull':
+                branch_name = Utils.runPullAndCommit(github, job.project_id, job.params['commit_message'], out_dir, self.session, job.report)
+                if branch_name is None:
+                    job.report("Failed to create the branch.", state='failed')
+                else:
+                    job.report(f"Created branch '{branch_name}'.", state='succeeded', result={'branch': branch_name})
+            else:
+                Utils.runDownloadAndPush(github, out_dir, job.report)
+                job.report("Pushed the main branch files to the main Thunkable app.", state='succeeded')
+        except SystemExit:
+            job.report("Failed to pull or push the Thunkable project.", state='failed')
+        except Exception as e:
+            job.report(f"An error occurred: {e}", state='failed')
+        finally:
+            with self.lock:
+                self.active.pop(key, None)
+            if job.type == 'pull':
+                shutil.rmtree(self.getWorkDirPath(job), ignore_errors=True)
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    The HTTP API of the sync service.
+
+    POST /jobs                 Queue a job: {"type": "pull", "project_id": ..., "commit_message": ...} or {"type": "push"}.
+    GET  /jobs/<id>            Get the state of a job.
+    GET  /jobs/<id>/events     Stream the progress events of a job as JSON lines until it finishes.
+    """
+
+    service = None
+
+    def sendJSON(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self.sendJSON(404, {'error': 'Not found.'})
+            return
+        try:
+            data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except json.JSONDecodeError:
+            self.sendJSON(400, {'error': 'Invalid JSON.'})
+            return
+
+        job_type = data.get('type')
+        if job_type not in JOB_TYPES:
+            self.sendJSON(400, {'error': f"The job type must be one of {', '.join(JOB_TYPES)}."})
+            return
+        if job_type == 'pull':
+            if not data.get('project_id') or not data.get('commit_message'):
+                self.sendJSON(400, {'error': 'A pull job needs a project_id and a commit_message.'})
+                return
+            project_id = data['project_id']
+        else:
+            project_id = Utils.getProjectIDFromURL(Config.getConfig().main_app_thunkable_site_url)
+
+        job, coalesced = self.service.submit(job_type, project_id, {'commit_message': data.get('commit_message')})
+        self.sendJSON(200, {'id': job.id, 'coalesced': coalesced, 'commit_message': job.params.get('commit_message')})
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        job = self.service.getJob(parts[1]) if len(parts) >= 2 and parts[0] == 'jobs' else None
+        if job is None:
+            self.sendJSON(404, {'error': 'Not found.'})
+            return
+
+        if len(parts) == 2:
+            self.sendJSON(200, job.toDict())
+            return
+        if len(parts) != 3 or parts[2] != 'events':
+            self.sendJSON(404, {'error': 'Not found.'})
+            return
+
+        # Stream the events without a length, the end of the response marks the end of the job.
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        sent = 0
+        while True:
+            with job.condition:
+                while sent == len(job.events) and not job.done:
+                    job.condition.wait()
+                events = job.events[sent:]
+                done = job.done
+            for event in events:
+                self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            sent += len(events)
+            if done and sent == len(job.events):
+                break
+        self.close_connection = True
+
+def serve(port=DEFAULT_PORT, workers=2):
+    """
+    Runs the sync service on localhost until interrupted.
+
+    Args:
+        port (int): The port to listen on.
+        workers (int): The number of jobs that run at the same time.
+
+    Returns:
+        None
+    """
+    ServiceRequestHandler.service = SyncService(workers)
+    server = ThreadingHTTPServer(('127.0.0.1', port), ServiceRequestHandler)
+    print(f"Sync service listening on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped the sync service.")
+    finally:
+        server.server_close()
+
+def submitJob(service_url, job):
+    """
+    Queues a job on a running sync service.
+
+    Args:
+        service_url (str): The URL of the sync service, e.g. "http://127.0.0.1:8750".
+        job (dict): The job, e.g. {"type": "push"}.
+
+    Returns:
+        dict: The job ID, whether it was coalesced with an identical job and the commit message it uses.
+    """
+    r = requests.post(f"{service_url.rstrip('/')}/jobs", json=job, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+def streamJobEvents(service_url, job_id):
+    """
+    Yields the progress events of a job on a running sync service until the job finishes.
+
+    Args:
+        service_url (str): The URL of the sync service.
+        job_id (str): The job ID.
+
+    Returns:
+        generator: The events, each with a "state" and a "message".
+    """
+    with requests.get(f"{service_url.rstrip('/')}/jobs/{job_id}/events", stream=True, timeout=None) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line:
+                yield json.loads(line)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Service",
+        description="Run a local service that queues, coalesces and runs push and pull jobs for several clients."
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2)
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    if Config.isConfigDataMissing():
+        print("Please fill in all fields in the config.json file.")
+        sys.exit(1)
+    serve(args.port, args.workers)
@@ -31,6 +31,16 @@ import base64
 from pathlib import Path
 import mimetypes
 import chardet
+import shutil
+import tarfile
+import requests
+import Assets
+import GithubCache
+from Config import getConfig
+from thunkd.thunkd import push, pull, pull_to_memory, encode_modular_project, safe_clean_path
+
+# The number of changed files from which the main branch is downloaded as one archive instead of file by file.
+ARCHIVE_DOWNLOAD_THRESHOLD = 20
 
 def getOutDirPath():
     """
@@ -52,91 +62,26 @@ def getProjectIDFromURL(url):
     project_id = parts[4]
     return project_id
 
-def getGithubAuthToken():
-    """
-    Retrieves the GitHub authentication token from the config file.
-
-    Returns:
-        str: The GitHub authentication token.
-    """
-    with open('config.json') as f:
-        config_data = json.load(f)
-    return config_data['GITHUB_AUTH_TOKEN']
-
-def getGithubRepoName():
+def getGithubRemote(github, repo_name):
     """
-    Retrieves the GitHub repository name from the config file.
-
-    Returns:
-        str: The GitHub repository name.
-    """
-    with open('config.json') as f:
-        config_data = json.load(f)
-    return config_data['GITHUB_REPO_NAME']
-
-def getGithubMainBranchName():
-    """
-    Retrieves the name of the main branch from the 'config.json' file.
-
-    Returns:
-        str: The name of the main branch.
-    """
-    with open('config.json') as f:
-        config_data = json.load(f)
-    return config_data['GITHUB_MAIN_BRANCH_NAME']
-
-def getMainAppThunkableSiteURL():
-    """
-    Retrieves the main app Thunkable site URL from the config file.
-
-    Returns:
-        str: The main app Thunkable site URL.
-    """
-    with open('config.json') as f:
-        config_data = json.load(f)
-    return config_data['MAIN_APP_THUNKABLE_SITE_URL']
-
-def setProjectNameInMetaDataFile(project_name):
-    """
-    Sets the project name in the metadata file.
+    Resolves the remote URL and repository owner used by the "git" backend.
 
     Args:
-        project_name (str): The new project name.
+        github (Github): An instance of the Github class for authentication.
+        repo_name (str): The name of the repository.
 
     Returns:
-        None
+        tuple: The remote URL and the owner login, or (None, None) if the repository was not found.
     """
-    # Load the JSON file
-    json_file_path = os.path.join(getOutDirPath(), 'meta.json') 
-    with open(json_file_path, 'r') as file:
-        data = json.load(file)
-
-    # Modify the "projectName" field
-    data['data']['project']['projectName'] = project_name
-
-    # Save the modified JSON back to the file
-    with open(json_file_path, 'w') as file:
-        json.dump(data, file, indent=4)
+    repo_url = getConfig().github_repo_url
+    if repo_url != '':
+        owner = github.get_user().login if github is not None else 'local'
+        return repo_url, owner
+    repo = getRepository(github, repo_name)
+    if repo is None:
+        return None, None
+    return repo.clone_url, repo.owner.login
 
-def isConfigDataMissing():
-    """
-    Checks if the config file is missing or if any of the required fields are missing.
-
-    Returns:
-        bool: True if the config file is missing or if any of the required fields are missing, False otherwise.
-    """
-    try:
-        with open('config.json') as f:
-            config_data = json.load(f)
-        if 'GITHUB_AUTH_TOKEN' not in config_data or 'GITHUB_REPO_NAME' not in config_data or 'GITHUB_MAIN_BRANCH_NAME' not in config_data or 'MAIN_APP_THUNKABLE_SITE_URL' not in config_data:
-            return True
-        if '' in config_data.values():
-            return True
-        return False
-    except FileNotFoundError:
-        return True
-  
-  
 def authenticateWithGithub():
     """
     Authenticates with Github using the provided authentication token (in config.json).
@@ -145,7 +90,8 @@ def authenticateWithGithub():
         An instance of the Github class if authentication is successful, None otherwise.
     """
     try:
-        github = Github(getGithubAuthToken())
+        # Revalidate repeated reads with conditional requests instead of fetching them again
+        github = GithubCache.installGithubCache(Github(getConfig().github_auth_token))
       
         user = github.get_user()
       
@@ -155,7 +101,70 @@ def authenticateWithGithub():
         print("Failed to authenticate with Github:", str(e))
         return None
       
-def createBranchAndCommit(github, repo_name, commitMessage):
+_repository_cache = {}
+
+def getRepository(github, repo_name):
+    """
+    Finds a repository of the authenticated user by name. The result is cached per Github instance,
+    so repeated syncs do not list the user's repositories again.
+
+    Args:
+        github (Github): An instance of the Github class for authentication.
+        repo_name (str): The name of the repository.
+
+    Returns:
+        The Repository if found, None otherwise.
+    """
+    key = (id(github), repo_name)
+    if key in _repository_cache and _repository_cache[key][0] is github:
+        return _repository_cache[key][1]
+
+    repo = None
+    user = github.get_user()
+    for userRepo in user.get_repos():
+        if userRepo.name == repo_name:
+            repo = userRepo
+            break
+
+    if repo is not None:
+        _repository_cache[key] = (github, repo)
+    return repo
+
+def getAssetTreeElements(repo, base_tree, assets):
+    """
+    Builds the tree elements that mirror the given assets into the "assets" directory of the repository.
+    Assets already present in the base tree with identical content are left out, so they are never re-uploaded.
+
+    Args:
+        repo (Repository): The repository to commit to.
+        base_tree (GitTree): The tree of the commit the new commit is based on.
+        assets (dict): A manifest mapping each asset URL to its repository path (see Assets.syncAssets).
+
+    Returns:
+        list: The InputGitTreeElement objects for the new or changed assets and the asset manifest.
+    """
+    existing = {}
+    for item in base_tree.tree:
+        if item.path == Assets.REPO_ASSETS_DIR and item.type == 'tree':
+            existing = {f"{Assets.REPO_ASSETS_DIR}/{child.path}": child.sha for child in repo.get_git_tree(item.sha).tree}
+            break
+
+    elements = []
+    for repo_path in sorted(set(assets.values())):
+        with open(Assets.getAssetObjectPath(Path(repo_path).stem), "rb") as f:
+            content_bytes = f.read()
+        if existing.get(repo_path) == Assets.getGitBlobSha(content_bytes):
+            continue
+        blob = repo.create_git_blob(base64.b64encode(content_bytes).decode('utf-8'), 'base64')
+        elements.append(InputGitTreeElement(path=repo_path, mode='100644', type='blob', sha=blob.sha))
+
+    manifest = json.dumps(assets, indent=4, sort_keys=True)
+    manifest_path = f"{Assets.REPO_ASSETS_DIR}/manifest.json"
+    if existing.get(manifest_path) != Assets.getGitBlobSha(manifest.encode('utf-8')):
+        elements.append(InputGitTreeElement(path=manifest_path, mode='100644', type='blob', content=manifest))
+    return elements
+
+def createBranchAndCommit(github, repo_name, commitMessage, assets=None, out_dir=None, files=None):
     """
     Creates a new branch and commits all the files in the "out" directory to the "src" directory in the specified repository.
 
@@ -163,27 +172,34 @@ def createBranchAndCommit(github, repo_name, commitMessage):
         github (Github): An instance of the Github class for authentication.
         repo_name (str): The name of the repository to operate on.
         commitMessage (str): The commit message for the new commit.
+        assets (dict): Optional asset manifest (see Assets.syncAssets) whose assets are committed to the "assets" directory.
+        out_dir (Path): Optional directory to commit instead of the "out" directory.
+        files (dict): Optional mapping from file name to UTF-8 file content (bytes) to commit instead of reading a directory.
 
     Raises:
         GithubException: If there is an error creating the branch and submitting the commit.
 
     Returns:
-        None
+        str: The name of the new branch, or None if it could not be created.
     """
+    config = getConfig()
+    if config.github_backend == 'git':
+        import GitBackend
+        remote_url, owner = getGithubRemote(github, repo_name)
+        if remote_url is None:
+            print(f"Repository '{repo_name}' not found.")
+            return None
+        return GitBackend.createBranchAndCommit(remote_url, commitMessage, assets, out_dir, owner, config.github_auth_token, files)
+
     try:
         # Get the repository by searching for it by name
-        repo = None
-        user = github.get_user()
-        for userRepo in user.get_repos():
-            if userRepo.name == repo_name:
-                repo = userRepo
-                break
+        repo = getRepository(github, repo_name)
 
         if repo is None:
             print(f"Repository '{repo_name}' not found.")
             return
 
-        source_branch = getGithubMainBranchName()
+        source_branch = config.github_main_branch_name
         source_branch_sha = repo.get_branch(source_branch).commit.sha
 
         # Generate a 4-letter unique ID
@@ -192,11 +208,20 @@ def createBranchAndCommit(github, repo_name, commitMessage):
         # Create the branch name
         branch_name = f"{repo.owner.login}-devbranch-{unique_id}"
 
-        # Commit all the files in the "out" directory to the "src" directory in the branch
-        files = os.listdir(getOutDirPath())
+        # Commit the in-memory files as they are, their encoding is already known
         commit_files = []
-        for file in files:
-            file_path = getOutDirPath() / file
+        if files is not None:
+            for file, content_bytes in files.items():
+                element = InputGitTreeElement(path=f"src/{file}", mode='100644', type='blob', content=content_bytes.decode('utf-8'))
+                commit_files.append(element)
+            out_files = []
+        else:
+            out_dir = Path(out_dir) if out_dir is not None else getOutDirPath()
+            out_files = os.listdir(out_dir)
+
+        # Commit all the files in the "out" directory to the "src" directory in the branch
+        for file in out_files:
+            file_path = out_dir / file
             with open(file_path, "rb") as f:
                 content_bytes = f.read()
 
@@ -225,22 +250,114 @@ def createBranchAndCommit(github, repo_name, commitMessage):
                 element = InputGitTreeElement(path=src_file_path, mode='100644', type='blob', content=content)
                 commit_files.append(element)
 
-        tree = repo.create_git_tree(tree=commit_files, base_tree=repo.get_git_tree(source_branch_sha))
+        base_tree = repo.get_git_tree(source_branch_sha)
+        if assets:
+            commit_files.extend(getAssetTreeElements(repo, base_tree, assets))
+
+        tree = repo.create_git_tree(tree=commit_files, base_tree=base_tree)
         parent = repo.get_git_commit(source_branch_sha)
         commit = repo.create_git_commit(message=commitMessage, tree=tree, parents=[parent])
         repo.create_git_ref(ref=f'refs/heads/{branch_name}', sha=commit.sha)
 
         print(f"Branch '{branch_name}' updated with new commit successfully.")
+        return branch_name
     except GithubException as e:
         print(f"Failed to create branch and submit commit in repository '{repo_name}': {e}")
         
-def downloadFilesFromMainBranch(github, repo_name):
+def getSrcTreeItems(repo, tree_sha):
+    """
+    Lists the .json and .xml files in the 'src' directory of a tree. Only the 'src' subtree is fetched recursively,
+    so the listing scales with the project instead of the whole repository and is not truncated by large repositories.
+
+    Args:
+        repo (Repository): The repository.
+        tree_sha (str): The SHA of the root tree, e.g. the tree of a commit.
+
+    Returns:
+        list: The GitTreeElement of each file, with paths relative to 'src'. Empty if there is no 'src' directory.
+    """
+    for item in repo.get_git_tree(tree_sha).tree:
+        if item.path == 'src' and item.type == 'tree':
+            return [
+                child for child in repo.get_git_tree(item.sha, recursive=True).tree
+                if child.type == 'blob' and (child.path.endswith('.json') or child.path.endswith('.xml'))
+            ]
+    return []
+
+def isLocalFileUpToDate(file_path, blob_sha):
+    """
+    Checks if a local file has exactly the content of a git blob.
+
+    Args:
+        file_path (Path): The local file.
+        blob_sha (str): The SHA of the git blob.
+
+    Returns:
+        bool: True if the file exists and matches the blob, False otherwise.
+    """
+    if not file_path.is_file():
+        return False
+    with open(file_path, 'rb') as f:
+        return Assets.getGitBlobSha(f.read()) == blob_sha
+
+def removeStaleLocalFiles(out_dir, expected_paths):
+    """
+    Removes the .json and .xml files in the "out" directory that are no longer part of the 'src' directory,
+    so they are not pushed along with the downloaded files.
+
+    Args:
+        out_dir (Path): The "out" directory.
+        expected_paths (set): The paths relative to out_dir that should be kept.
+
+    Returns:
+        None
+    """
+    for file_path in out_dir.iterdir():
+        if file_path.is_file() and file_path.suffix in ('.json', '.xml') and file_path.name not in expected_paths:
+            print(f"Removing stale file: {file_path.name}")
+            file_path.unlink()
+
+def downloadSrcArchive(repo, branch_name, out_dir):
+    """
+    Downloads the .json and .xml files of the 'src' directory from the branch tarball in a single request.
+    The archive is extracted while it streams in, so it is never held in memory as a whole.
+
+    Args:
+        repo (Repository): The repository.
+        branch_name (str): The branch to download.
+        out_dir (Path): The directory to extract the files to.
+
+    Returns:
+        None
+    """
+    archive_url = repo.get_archive_link('tarball', ref=branch_name)
+    with requests.get(archive_url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True
+        with tarfile.open(fileobj=r.raw, mode='r|gz') as tar:
+            for member in tar:
+                # Entries are named "<owner>-<repo>-<sha>/<path>".
+                parts = member.name.split('/', 1)
+                if not member.isfile() or len(parts) != 2:
+                    continue
+                path = parts[1]
+                if not path.startswith('src/') or not (path.endswith('.json') or path.endswith('.xml')):
+                    continue
+
+                print(f"Extracting file: {path}")
+                file_path = out_dir / path[4:]
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                with tar.extractfile(member) as src, open(file_path, 'wb') as f:
+                    shutil.copyfileobj(src, f)
+
+def downloadFilesFromMainBranch(github, repo_name, out_dir=None):
     """
     Downloads files from the 'src' directory in the main branch of a GitHub repository.
 
     Args:
         github (Github): An instance of the `Github` class from the `PyGithub` library.
         repo_name (str): The name of the repository.
+        out_dir (Path): Optional directory to download into instead of the "out" directory.
 
     Raises:
         GithubException: If there is an error while downloading the files.
@@ -250,71 +367,137 @@ def downloadFilesFromMainBranch(github, repo_name):
     """
     import base64
     import os
-    import mimetypes
-    import chardet  # Ensure chardet is installed
+
+    config = getConfig()
+    if config.github_backend == 'git':
+        import GitBackend
+        remote_url, _ = getGithubRemote(github, repo_name)
+        if remote_url is None:
+            print(f"Repository '{repo_name}' not found.")
+            return
+        GitBackend.downloadFilesFromMainBranch(remote_url, out_dir, config.github_auth_token)
+        return
 
     try:
         # Get the repository by searching for it by name
-        repo = None
-        user = github.get_user()
-        for userRepo in user.get_repos():
-            if userRepo.name == repo_name:
-                repo = userRepo
-                break
+        repo = getRepository(github, repo_name)
 
         if repo is None:
             print(f"Repository '{repo_name}' not found.")
             return
 
         # Get the branch
-        branch_name = 'main'  # Change if necessary
+        branch_name = config.github_main_branch_name
         branch = repo.get_branch(branch_name)
 
-        # Get the tree of the branch, targeting the 'src' directory
-        tree = repo.get_git_tree(branch.commit.sha, recursive=True).tree
-        src_items = [item for item in tree if item.path.startswith('src/') and (item.path.endswith('.json') or item.path.endswith('.xml'))]
+        # Get the tree of the 'src' directory only, not the whole repository
+        src_items = getSrcTreeItems(repo, branch.commit.commit.tree.sha)
+
+        # Only download the files that differ from what is already in the "out" directory
+        out_dir = Path(out_dir) if out_dir is not None else getOutDirPath()
+        out_dir.mkdir(exist_ok=True)
+        changed_items = [item for item in src_items if not isLocalFileUpToDate(out_dir / item.path, item.sha)]
+        removeStaleLocalFiles(out_dir, {item.path for item in src_items})
+        print(f"{len(changed_items)} of {len(src_items)} files changed.")
+
+        # For many changed files, a single archive request is cheaper than a blob request per file
+        if len(changed_items) >= ARCHIVE_DOWNLOAD_THRESHOLD:
+            downloadSrcArchive(repo, branch_name, out_dir)
+            changed_items = []
 
         # Iterate over filtered items and download files
-        for item in src_items:
+        for item in changed_items:
             # Get the file content
             content = repo.get_git_blob(item.sha).content
-            print(f"Downloading file: {item.path}")
-
-            # Check the MIME type
-            mime_type, _ = mimetypes.guess_type(item.path)
-            text_file_types = {'application/json', 'text/xml'}
+            print(f"Downloading file: src/{item.path}")
 
-            # Remove 'src/' from the path for local storage
-            local_path = item.path[4:]
-            file_path = os.path.join(getOutDirPath(), local_path)  # Adjust output_dir to your desired path
+            # Paths are relative to 'src' for local storage
+            local_path = item.path
+            file_path = os.path.join(out_dir, local_path)  # Adjust output_dir to your desired path
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-            if mime_type in text_file_types:
-                content_bytes = base64.b64decode(content)
-
-                # Detect encoding
-                detected_encoding = chardet.detect(content_bytes)['encoding']
-                print(f"Detected encoding: {detected_encoding if detected_encoding else 'None'}")
-
-                if detected_encoding:
-                    # Decode using detected encoding
-                    decoded_content = content_bytes.decode(detected_encoding)
-                else:
-                    # Treat as binary if encoding is undetected
-                    decoded_content = content_bytes
-
-                # Write to the file
-                mode = 'w' if detected_encoding else 'wb'
-                with open(file_path, mode) as f:
-                    f.write(decoded_content)
-            else:
-                # Write binary content directly
-                with open(file_path, 'wb') as f:
-                    f.write(base64.b64decode(content))
+            # Write the blob's bytes unchanged, like the archive download does, so the file keeps matching the blob
+            # (see isLocalFileUpToDate) whatever the platform's newline and default encoding are.
+            with open(file_path, 'wb') as f:
+                f.write(base64.b64decode(content))
 
         print("Files from 'src' directory downloaded successfully.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
     except GithubException as e:
-        print(f"Failed to download files from 'src' directory: {e}")
\ No newline at end of file
+        print(f"Failed to download files from 'src' directory: {e}")
+
+def runPullAndCommit(github, project_id, commit_message, out_dir=None, session=None, report=print, write_to_disk=False):
+    """
+    Downloads a dev project from Thunkable and commits it to a new branch in the configured repository.
+    The project is handed to the commit in memory, it is only written to disk if write_to_disk is set.
+    With the "stream" PULL_MODE it is always written to out_dir and committed from there.
+
+    Args:
+        github (Github): An instance of the Github class for authentication.
+        project_id (str): The Thunkable project ID of the dev app.
+        commit_message (str): The commit message for the new commit.
+        out_dir (Path): Optional directory to write the files to instead of the "out" directory.
+        session (requests.Session): Optional session to reuse for the Thunkable and asset requests.
+        report (callable): Called with a short message as each step starts.
+        write_to_disk (bool): Whether to also write the pulled files to out_dir.
+
+    Returns:
+        str: The name of the new branch, or None if it could not be created.
+    """
+    # Download the dev thunkable app, naming it after the commit
+    report("Downloading the dev project files...")
+    config = getConfig()
+    project_name = config.github_repo_name + " - Main App" + " (" + commit_message + ")"
+    if config.pull_mode == 'stream':
+        # The project is never held in memory as a whole, so it is committed from the files on disk.
+        out_dir = Path(out_dir) if out_dir is not None else getOutDirPath()
+        pull(project_id, out_dir, True, True, session, stream=True, project_name=project_name)
+
+        report("Mirroring the project assets...")
+        assets = Assets.syncAssets(out_dir, session=session)
+
+        report("Creating the branch and committing the files...")
+        return createBranchAndCommit(github, config.github_repo_name, commit_message, assets, out_dir)
+
+    modular_project = pull_to_memory(project_id, True, True, project_name, session)
+    files = encode_modular_project(modular_project)
+
+    if write_to_disk:
+        out_dir = Path(out_dir) if out_dir is not None else getOutDirPath()
+        safe_clean_path(out_dir)
+        for file, content_bytes in files.items():
+            (out_dir / file).write_bytes(content_bytes)
+
+    # Mirror the assets referenced by the project into the local asset store
+    report("Mirroring the project assets...")
+    assets = Assets.syncProjectAssets(modular_project["meta.json"], session=session)
+
+    # Create a new branch and commit the files (location: root/src) and assets (location: root/assets)
+    report("Creating the branch and committing the files...")
+    return createBranchAndCommit(github, config.github_repo_name, commit_message, assets, files=files)
+
+def runDownloadAndPush(github, out_dir=None, report=print):
+    """
+    Downloads the files of the main branch and pushes them to the main app in Thunkable.
+
+    Args:
+        github (Github): An instance of the Github class for authentication.
+        out_dir (Path): Optional directory to download into instead of the "out" directory.
+        report (callable): Called with a short message as each step starts.
+
+    Returns:
+        None
+    """
+    config = getConfig()
+    out_dir = Path(out_dir) if out_dir is not None else getOutDirPath()
+
+    # Download all files from the main branch to the "out" directory
+    report("Downloading the main branch files...")
+    downloadFilesFromMainBranch(github, config.github_repo_name, out_dir)
+
+    # Push the downloaded files from main branch to the main app in thunkable
+    report("Pushing the files to the main Thunkable app...")
+    mainProjectID = getProjectIDFromURL(config.main_app_thunkable_site_url)
+    push(mainProjectID, out_dir, True, config.push_mode == 'modules')
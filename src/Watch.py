@@ -0,0 +1,205 @@
+"""
+MIT License
+
+Copyright (c) 2024 Zaid Shahzad
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import time
+import argparse
+import requests
+from thunkd.thunkd import fetch_project_status
+import Utils
+import Config
+
+class WatchedProject:
+    """
+    The polling state of a single watched Thunkable project.
+
+    A project is polled with a cheap status request. While it stays unchanged, its polling interval doubles
+    up to max_interval. When it changes, the interval drops back to min_interval and the project is marked
+    as pending. A pending project is only synced once it has stopped changing for quiet_period seconds,
+    so a burst of edits ends up in a single commit. After a failed sync, the next attempt is delayed by
+    an interval that doubles with every consecutive failure, up to max_interval.
+    """
+
+    def __init__(self, project_id, min_interval, max_interval, quiet_period):
+        self.project_id = project_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.quiet_period = quiet_period
+        self.interval = min_interval
+        self.next_check = 0.0
+        self.last_hash = None
+        self.synced_hash = None
+        self.last_change = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def pending(self):
+        return self.last_hash is not None and self.last_hash != self.synced_hash
+
+    def observe(self, status, now):
+        """
+        Records the result of a status check and schedules the next one.
+
+        Args:
+            status (dict): The project status (see fetch_project_status), or None if the check failed.
+            now (float): The current monotonic time.
+
+        Returns:
+            bool: True if the project has settled on unsynced changes and should be synced now.
+        """
+        if status is None:
+            self.interval = min(self.interval * 2, self.max_interval)
+            self.next_check = now + self.interval
+            return False
+
+        current_hash = status.get("hash") or status.get("updatedAt")
+        if self.synced_hash is None and self.last_hash is None:
+            # The first check only establishes the baseline, there is nothing to capture yet.
+            self.last_hash = self.synced_hash = current_hash
+        elif current_hash != self.last_hash:
+            self.last_hash = current_hash
+            self.last_change = now
+            self.interval = self.min_interval
+
+        if self.pending:
+            settled = now - self.last_change >= self.quiet_period and now >= self.retry_at
+            self.next_check = max(now + min(self.min_interval, self.quiet_period), self.retry_at)
+            return settled
+
+        self.interval = min(self.interval * 2, self.max_interval)
+        self.next_check = now + self.interval
+        return False
+
+    def syncSucceeded(self, now):
+        """
+        Records a successful sync of the last observed changes.
+        """
+        self.synced_hash = self.last_hash
+        self.failures = 0
+        self.retry_at = 0.0
+        self.interval = self.min_interval
+        self.next_check = now + self.interval
+
+    def syncFailed(self, now):
+        """
+        Records a failed sync and backs off before the next attempt.
+        """
+        self.failures += 1
+        self.interval = min(self.min_interval * 2 ** self.failures, self.max_interval)
+        self.retry_at = now + self.interval
+        self.next_check = self.retry_at
+
+def syncProject(github, session, project):
+    """
+    Pulls a watched project and commits it to a new branch in the configured repository.
+
+    Args:
+        github (Github): The authenticated Github instance, reused across cycles.
+        session (requests.Session): The session used for Thunkable and asset requests, reused across cycles.
+        project (WatchedProject): The project to sync.
+
+    Returns:
+        bool: True if the project was committed, False otherwise.
+    """
+    commit_message = f"Auto-sync of Thunkable project {project.project_id}"
+
+    try:
+        branch_name = Utils.runPullAndCommit(github, project.project_id, commit_message, session=session)
+    except SystemExit:
+        print(f"Failed to pull Thunkable project {project.project_id}.")
+        return False
+    except requests.RequestException as e:
+        print(f"Failed to sync Thunkable project {project.project_id}: {e}")
+        return False
+    except Exception as e:
+        # A long-running watcher must outlive any single failed sync.
+        print(f"An error occurred while syncing Thunkable project {project.project_id}: {e!r}")
+        return False
+    return branch_name is not None
+
+def watch(project_ids, min_interval, max_interval, quiet_period):
+    """
+    Watches Thunkable projects and commits each one to a new branch whenever it changes. Runs until interrupted.
+
+    Args:
+        project_ids (list): The Thunkable project IDs to watch.
+        min_interval (float): The shortest time between two checks of a project, in seconds.
+        max_interval (float): The longest time between two checks of an idle project, in seconds.
+        quiet_period (float): How long a project must stay unchanged before its changes are committed, in seconds.
+
+    Returns:
+        None
+    """
+    github = Utils.authenticateWithGithub()
+    if github is None:
+        return
+
+    session = requests.Session()
+    projects = [WatchedProject(project_id, min_interval, max_interval, quiet_period) for project_id in project_ids]
+    print(f"Watching {len(projects)} project(s).")
+
+    try:
+        while True:
+            project = min(projects, key=lambda p: p.next_check)
+            delay = project.next_check - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            try:
+                status = fetch_project_status(project.project_id, session=session)
+            except requests.RequestException as e:
+                print(f"Failed to check Thunkable project {project.project_id}: {e}")
+                status = None
+
+            if project.observe(status, time.monotonic()):
+                print(f"Project {project.project_id} changed, syncing.")
+                if syncProject(github, session, project):
+                    project.syncSucceeded(time.monotonic())
+                else:
+                    project.syncFailed(time.monotonic())
+                    print(f"Retrying project {project.project_id} in {project.interval:.0f}s.")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        session.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Watch",
+        description="Watch Thunkable projects and commit them to new branches whenever they change."
+    )
+    parser.add_argument("projects", nargs="+", help="Thunkable project IDs or project site URLs.")
+    parser.add_argument("--min-interval", type=float, default=15.0)
+    parser.add_argument("--max-interval", type=float, default=600.0)
+    parser.add_argument("--quiet-period", type=float, default=60.0)
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    if Config.isConfigDataMissing():
+        print("Please fill in all fields in the config.json file.")
+        sys.exit(1)
+    project_ids = [Utils.getProjectIDFromURL(p) if "/" in p else p for p in args.projects]
+    watch(project_ids, args.min_interval, args.max_interval, args.quiet_period)
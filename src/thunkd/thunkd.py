@@ -22,20 +22,90 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 """
 
 
+import os
 import re
 import copy
+import codecs
+import functools
+import hashlib
 import json
+import pickle
 import shutil
 import logging
 import requests
 from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from Config import getConfig
 import json
-    
-def getThunkableToken():
-    with open('config.json') as f:
-        config_data = json.load(f)
-    return config_data['THUNKABLE_TOKEN']
 
+
+# The file name prefix used for module files in a modular project.
+MODULE_PREFIX = "module"
+
+# The marker of a complete path in a compiled clean rule trie.
+CLEAN_RULE_END = None
+
+# The paths removed from a Thunkable project by to_clean_project. A "*" matches every key at that level.
+DIRTY_PATHS = (
+    ("data", "user"),
+    ("data", "project", "id"),
+    ("data", "project", "blocklyStringLength"),
+    ("data", "project", "componentStringLength"),
+    ("data", "project", "createdAt"),
+    ("data", "project", "email"),
+    ("data", "project", "hash"),
+    ("data", "project", "isArchiveProjectFileUsed"),
+    ("data", "project", "isHiddenFromPublicGallery"),
+    ("data", "project", "isLegacy"),
+    ("data", "project", "isOwner"),
+    ("data", "project", "isPublic"),
+    ("data", "project", "isQRCodeScanned"),
+    ("data", "project", "isLiveTesting"),
+    ("data", "project", "settings", "packageName"),
+    ("data", "project", "projectSettings", "packageName"),
+    ("data", "project", "storageSize"),
+    ("data", "project", "webAppSettings"),
+    ("data", "project", "webCompanionSettings"),
+    ("data", "project", "frontendProperties"),
+    ("data", "project", "appId"),
+    ("data", "project", "readOnly"),
+    ("data", "project", "shares"),
+    ("data", "project", "versions"),
+    ("data", "project", "projectSnapshotsMetaData"),
+    ("data", "project", "projectSnapshotParentId"),
+    ("data", "project", "projectSnapshotParent"),
+    ("data", "project", "updatedAt"),
+    ("data", "project", "username"),
+    ("data", "project", "blockly", "*", "code"),
+    ("data", "project", "blockly", "*", "appVariableDefCode"),
+)
+
+# The pickled bytes of a modular project each worker process must have to write or encode, so that starting it pays
+# off. Measured with benchmarks/bench_modular_write.py (spawn, as on Windows): a worker takes ~165ms to start, while
+# writing takes ~120ms per pickled MB serially. With 8MB per worker, a pool is only used from 16MB and startup stays
+# well below the time the worker saves. Smaller projects are handled serially.
+PARALLEL_WRITE_BYTES_PER_WORKER = 8 * 1024 * 1024
+
+# The size of the chunks a streaming pull reads from the response.
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Marks a container whose members are each parsed and handed over on their own while streaming.
+STREAM_SPLIT = "*"
+
+# The parts of a pulled project that a streaming pull parses one value at a time: each blockly entry, each top level
+# screen or navigator and each module. Everything else is small and is parsed at the end as the metadata.
+PULL_STREAM_SPEC = {
+    "data": {
+        "project": {
+            "blockly": STREAM_SPLIT,
+            "components": {"children": STREAM_SPLIT},
+            "modules": STREAM_SPLIT,
+        },
+    },
+}
+
+    
 def dump_json(data: dict) -> str:
     """
     Convert a dictionary to a formatted JSON string.
@@ -100,13 +170,80 @@ def load_xml(data: str) -> str:
 
 
 
-def read_modular_project(project_path: Path) -> dict:
+def get_cache_path(project_path: Path) -> Path:
+    """
+    Get the directory that caches the parsed files of a project path. It sits next to the project path rather than
+    inside it, so it is never mistaken for part of the project.
+
+    Parameters
+    ----------
+    project_path: The project path.
+
+    Returns
+    -------
+    The cache path.
+    """
+    return project_path.parent.joinpath(f".{project_path.name}.cache")
+
+
+def load_cached_file(path: Path, load_func, cache_path: Path):
+    """
+    Load and parse a file, reusing the parsed content cached by an earlier load when the file did not change.
+
+    Each file has its own binary cache entry holding its size, modification time, SHA-256 and parsed content. If the
+    size and modification time match, the entry is used without reading the file. If only the modification time
+    differs, the file is hashed and the entry is still used when the content is the same. Otherwise the file is parsed
+    and only its entry is rewritten.
+
+    Like git's index, a file modified no earlier than its entry was written is "racily clean": a same-size rewrite
+    within the filesystem's timestamp resolution would keep the modification time, so such a file is always hashed.
+
+    Parameters
+    ----------
+    path: The file path.
+    load_func: The function that parses the file text.
+    cache_path: The cache path (see get_cache_path).
+
+    Returns
+    -------
+    The parsed file content.
+    """
+    entry_path = cache_path.joinpath(f"{path.name}.pickle")
+    stat = path.stat()
+
+    entry = None
+    if entry_path.exists():
+        try:
+            entry_mtime_ns = entry_path.stat().st_mtime_ns
+            entry = pickle.loads(entry_path.read_bytes())
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            entry = None
+
+    if (entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+            and stat.st_mtime_ns < entry_mtime_ns):
+        return entry["data"]
+
+    text = path.read_text()
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    if entry is not None and entry["sha256"] == digest:
+        data = entry["data"]
+    else:
+        data = load_func(text)
+
+    cache_path.mkdir(parents=True, exist_ok=True)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "data": data}
+    entry_path.write_bytes(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+    return data
+
+
+def read_modular_project(project_path: Path, use_cache: bool = False) -> dict:
     """
     Load a modular project from disk. A modular project is a mapping from file names to file content.
 
     Parameters
     ----------
     project_path: The modular project path.
+    use_cache: Whether to reuse the parsed content of unchanged files from the binary cache (see load_cached_file).
 
     Returns
     -------
@@ -114,6 +251,7 @@ def read_modular_project(project_path: Path) -> dict:
     """
     modular_project = {}
     suffix_to_load = {".json": load_json, ".xml": load_xml}
+    cache_path = get_cache_path(project_path=project_path)
     # Map the name of each file in the project path to its contents as a Python object.
     # TODO: This glob does not always work since directories can contain the '.' character.
     for path in project_path.glob("*.*"):
@@ -122,36 +260,222 @@ def read_modular_project(project_path: Path) -> dict:
             logging.info(f"\tpath = {path}")
             continue
         load_func = suffix_to_load[path.suffix]
-        modular_project[path.name] = load_func(path.read_text())
+        if use_cache:
+            modular_project[path.name] = load_cached_file(path=path, load_func=load_func, cache_path=cache_path)
+        else:
+            modular_project[path.name] = load_func(path.read_text())
+
+    # Drop the cache entries of files that no longer exist.
+    if use_cache and cache_path.exists():
+        for entry_path in cache_path.glob("*.pickle"):
+            if entry_path.stem not in modular_project:
+                entry_path.unlink()
     return modular_project
 
 
-def write_modular_project(project_path: Path, modular_project: dict) -> None:
+def dump_modular_file(name: str, data) -> str:
+    """
+    Convert the content of a modular project file to the text written to disk.
+
+    Parameters
+    ----------
+    name: The file name. The suffix selects the format.
+    data: The file content.
+
+    Returns
+    -------
+    The formatted file content.
+    """
+    suffix_to_dump = {".json": dump_json, ".xml": dump_xml}
+    return suffix_to_dump[Path(name).suffix](data)
+
+
+def write_modular_file(file_path: Path, data) -> None:
+    """
+    Write a single file of a modular project to disk.
+
+    Parameters
+    ----------
+    file_path: The file path. The suffix selects the format.
+    data: The file content.
+
+    Returns
+    -------
+    None
+    """
+    file_path.write_text(dump_modular_file(name=file_path.name, data=data))
+
+
+def write_pickled_modular_file(file_path: Path, pickled_data: bytes) -> None:
+    """
+    Write a single file of a modular project to disk from its pickled content. This runs in a worker process.
+
+    Parameters
+    ----------
+    file_path: The file path. The suffix selects the format.
+    pickled_data: The pickled file content.
+
+    Returns
+    -------
+    None
+    """
+    write_modular_file(file_path=file_path, data=pickle.loads(pickled_data))
+
+
+def encode_pickled_modular_file(name: str, pickled_data: bytes) -> bytes:
+    """
+    Convert a single file of a modular project to its bytes from its pickled content. This runs in a worker process.
+
+    Parameters
+    ----------
+    name: The file name. The suffix selects the format.
+    pickled_data: The pickled file content.
+
+    Returns
+    -------
+    The file content (bytes).
+    """
+    return dump_modular_file(name=name, data=pickle.loads(pickled_data)).encode("utf-8")
+
+
+def get_parallel_jobs(modular_project: dict, workers: int = None):
+    """
+    Pickle the files of a modular project for worker processes, largest first so that the biggest screens do not end
+    up last on a single core.
+
+    Parameters
+    ----------
+    modular_project: The modular project.
+    workers: The number of worker processes. Defaults to the number of CPUs. Use 1 to always work serially.
+
+    Returns
+    -------
+    The number of workers and the (name, pickled data) jobs, or None if the project is too small for more than one
+    worker (see PARALLEL_WRITE_BYTES_PER_WORKER) or there is a single CPU, in which case the files are handled serially.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(modular_project))
+    if workers <= 1:
+        return None
+
+    # The data has to be pickled to reach the workers anyway, and the pickle size is a cheap estimate of the work.
+    # Pickling costs a few percent of the serial write, so it is not worth estimating the size another way.
+    jobs = [(name, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)) for name, data in modular_project.items()]
+    total_size = sum(len(pickled_data) for _, pickled_data in jobs)
+    workers = min(workers, total_size // max(PARALLEL_WRITE_BYTES_PER_WORKER, 1))
+    if workers <= 1:
+        return None
+    jobs.sort(key=lambda job: len(job[1]), reverse=True)
+    return workers, jobs
+
+
+def write_modular_project(project_path: Path, modular_project: dict, workers: int = None) -> None:
     """
     Write a modular project to disk. A modular project is a mapping from file names to file content.
 
+    Large projects are serialized and written across worker processes (see get_parallel_jobs). The written files are
+    identical to the serial path.
+
     Parameters
     ----------
     project_path: The modular project path.
     modular_project: The modular project.
+    workers: The number of worker processes. Defaults to the number of CPUs. Use 1 to write serially.
 
     Returns
     -------
     None
     """
     project_path.mkdir(exist_ok=True)
-    suffix_to_dump = {".json": dump_json, ".xml": dump_xml}
-    # Write the data mapped to each name to disk.
-    for name, data in modular_project.items():
-        dump_func = suffix_to_dump[Path(name).suffix]
-        project_path.joinpath(name).write_text(dump_func(data))
+
+    parallel = get_parallel_jobs(modular_project=modular_project, workers=workers)
+    if parallel is None:
+        # Write the data mapped to each name to disk.
+        for name, data in modular_project.items():
+            write_modular_file(file_path=project_path.joinpath(name), data=data)
+        return
+
+    workers, jobs = parallel
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_pickled_modular_file, project_path.joinpath(name), pickled_data) for name, pickled_data in jobs]
+        for future in futures:
+            future.result()
+
+
+def split_screen(screen: dict) -> tuple:
+    """
+    Extract the UI elements of a screen for a modular project, leaving only the screen ID behind.
+
+    Parameters
+    ----------
+    screen: The screen. It is replaced in place by {"id": <screen_id>}.
+
+    Returns
+    -------
+    The file name "<screen_name>.<screen_id>.json" and the UI elements of the screen.
+    """
+    screen_name, screen_id = screen["name"], screen["id"]
+    if re.search(r"[^\w\- ]+", screen_name) is not None:
+        logging.fatal("Encountered invalid screen name.")
+        logging.fatal(f"\tscreen_name = {screen_name}")
+        logging.fatal(f"\tscreen_id = {screen_id}")
+        logging.info("The screen name cannot contain special characters besides '-' and '_'.")
+        exit(1)
+    path = f"{screen['name']}.{screen['id']}.json"
+    data = copy.deepcopy(screen)
+    screen.clear()
+    screen["id"] = screen_id
+    return path, data
+
+
+def split_module(module: dict) -> dict:
+    """
+    Extract the UI elements and the blocks of a module for a modular project, as "module.<module_name>.<module_id>.json"
+    and "module.<module_name>.<module_id>.<blockly_id>.xml".
+
+    Parameters
+    ----------
+    module: The module. The extracted UI elements and blocks are deleted from it in place.
+
+    Returns
+    -------
+    A mapping from file names to the extracted data.
+    """
+    files = {}
+    module_name, module_id = module["name"], module["id"]
+    if re.search(r"[^\w\- ]+", module_name) is not None:
+        logging.fatal("Encountered invalid module name.")
+        logging.fatal(f"\tmodule_name = {module_name}")
+        logging.fatal(f"\tmodule_id = {module_id}")
+        logging.info("The module name cannot contain special characters besides '-' and '_'.")
+        exit(1)
+
+    # Add the UI elements to the modular project.
+    if module.get("components") is not None:
+        path = f"{MODULE_PREFIX}.{module_name}.{module_id}.json"
+        files[path] = module["components"]
+
+        # Delete the UI elements.
+        module["components"] = None
+
+    # Add the blocks to the modular project.
+    blockly = module.get("blockly")
+    if isinstance(blockly, dict):
+        for blockly_id in blockly:
+            if isinstance(blockly[blockly_id], dict) and "xml" in blockly[blockly_id]:
+                path = f"{MODULE_PREFIX}.{module_name}.{module_id}.{blockly_id}.xml"
+                files[path] = blockly[blockly_id]["xml"]
+
+                # Delete the blocks.
+                blockly[blockly_id]["xml"] = ""
+    return files
 
 
 def to_modular_project(project: dict) -> dict:
     """
     Convert a Thunkable project to a modular project. This maps "meta.json" to metadata,
     "<screen_name>.<screen_id>.json" to the UI elements for that screen and "<screen_name>.<screen_id>.xml" to
-    the block code for that screen.
+    the block code for that screen. Each module is split the same way into "module.<module_name>.<module_id>.json"
+    for its UI elements and "module.<module_name>.<module_id>.<blockly_id>.xml" for its block code.
 
     Parameters
     ----------
@@ -183,16 +507,8 @@ def to_modular_project(project: dict) -> dict:
     
     for i, screen in enumerate(screens):
         screen_name, screen_id = screen["name"], screen["id"]
-        if re.search(r"[^\w\- ]+", screen_name) is not None:
-            logging.fatal("Encountered invalid screen name.")
-            logging.fatal(f"\tscreen_name = {screen_name}")
-            logging.fatal(f"\tscreen_id = {screen_id}")
-            logging.info("The screen name cannot contain special characters besides '-' and '_'.")
-            exit(1)
-        path = f"{screen['name']}.{screen['id']}.json"
-        modular_project[path] = copy.deepcopy(screen)
-        screen.clear()
-        screen["id"] = screen_id
+        path, data = split_screen(screen=screen)
+        modular_project[path] = data
         screen_id_to_name[screen_id] = screen_name
 
     # Extract the blocks.
@@ -210,11 +526,32 @@ def to_modular_project(project: dict) -> dict:
             # Delete the blocks.
             iproject["blockly"][screen_id]["xml"] = ""
 
+    # Extract the modules.
+    for module in iproject.get("modules") or []:
+        modular_project.update(split_module(module=module))
+
     # Everything that is leftover is metadata.
     modular_project["meta.json"] = project
     return modular_project
 
 
+def is_module_file(name: str) -> bool:
+    """
+    Check if a modular project file name belongs to a module rather than a screen. Module files are named
+    "module.<module_name>.<module_id>.json" and "module.<module_name>.<module_id>.<blockly_id>.xml".
+
+    Parameters
+    ----------
+    name: The file name.
+
+    Returns
+    -------
+    True if the file belongs to a module, False otherwise.
+    """
+    parts = Path(name).stem.split(".")
+    return len(parts) >= 3 and parts[0] == MODULE_PREFIX
+
+
 def from_modular_project(modular_project: dict) -> dict:
     modular_project = copy.deepcopy(modular_project)
     
@@ -230,9 +567,26 @@ def from_modular_project(modular_project: dict) -> dict:
         else:
             screens.append(screen_or_nav)
 
+    modules = {module["id"]: module for module in iproject.get("modules") or []}
+
     for name, data in modular_project.items():
         path = Path(name)
-        if path.suffix == ".json":
+        if is_module_file(name):
+            module_id = path.stem.split(".")[2]
+            if module_id not in modules:
+                logging.fatal("Encountered unexpected module file.")
+                logging.info(f"\t\tpath = {path}")
+                exit(1)
+            if path.suffix == ".json":
+                modules[module_id]["components"] = data
+            elif path.suffix == ".xml":
+                blockly_id = path.stem.split(".")[3]
+                modules[module_id]["blockly"][blockly_id]["xml"] = data
+            else:
+                logging.fatal("Invalid file type encountered in modular project.")
+                logging.info(f"\t\tname = {name}")
+                exit(1)
+        elif path.suffix == ".json":
             for screen in screens:
                 if screen["id"] == str(path.stem).split(".")[-1]:
                     break
@@ -252,88 +606,198 @@ def from_modular_project(modular_project: dict) -> dict:
     return project
 
 
-def delete_path_if_exists(d: dict, path: list):
-    if len(path) == 0 or not isinstance(d, dict) or path[0] not in d:
-        return
-    
-    if len(path) == 1:
-        del d[path[0]]
+def compile_clean_rules(paths) -> dict:
+    """
+    Compile paths to delete into a trie. Each path is a list of keys, or a string of keys separated by "/". A "*" key
+    matches every key at that level. A node holding CLEAN_RULE_END deletes the value it is reached at.
+
+    Parameters
+    ----------
+    paths: The paths to delete.
+
+    Returns
+    -------
+    The trie, a nested mapping from keys to sub-tries.
+    """
+    trie = {}
+    for path in paths:
+        if isinstance(path, str):
+            path = path.strip("/").split("/")
+        node = trie
+        for key in path:
+            node = node.setdefault(key, {})
+        node[CLEAN_RULE_END] = True
+    return trie
+
+
+@functools.lru_cache(maxsize=8)
+def get_clean_rules(extra_paths: tuple = ()) -> dict:
+    """
+    Get the compiled clean rules, made of the default dirty paths and any extra paths. Compiled rules are cached.
+
+    Parameters
+    ----------
+    extra_paths: Extra paths to delete, e.g. the "CLEAN_PATHS" from config.json.
+
+    Returns
+    -------
+    The compiled rules (see compile_clean_rules).
+    """
+    return compile_clean_rules(list(DIRTY_PATHS) + list(extra_paths))
+
+
+def prune(d: dict, trie: dict) -> None:
+    """
+    Delete every value matched by a compiled rule trie from a dictionary, in a single traversal.
+
+    Parameters
+    ----------
+    d: The dictionary. It is modified in place.
+    trie: The compiled rules (see compile_clean_rules).
+
+    Returns
+    -------
+    None
+    """
+    if not isinstance(d, dict):
         return
-    
-    delete_path_if_exists(d=d[path[0]], path=path[1:])
+
+    wildcard = trie.get("*")
+    # Without a wildcard only the keys named by the rules need to be visited, not every key of d.
+    keys = list(d) if wildcard is not None else [key for key in trie if key in d]
+    for key in keys:
+        exact = trie.get(key)
+        if (exact is not None and CLEAN_RULE_END in exact) or (wildcard is not None and CLEAN_RULE_END in wildcard):
+            del d[key]
+            continue
+        if exact is not None:
+            prune(d=d[key], trie=exact)
+        if wildcard is not None:
+            prune(d=d[key], trie=wildcard)
 
 
-def to_clean_project(project: dict) -> dict:
-    project = copy.deepcopy(project)
-    dirty_paths = [
-        ["data", "user"],
-        ["data", "project", "id"],
-        ["data", "project", "blocklyStringLength"],
-        ["data", "project", "componentStringLength"],
-        ["data", "project", "createdAt"],
-        ["data", "project", "email"],
-        ["data", "project", "hash"],
-        ["data", "project", "isArchiveProjectFileUsed"],
-        ["data", "project", "isHiddenFromPublicGallery"],
-        ["data", "project", "isLegacy"],
-        ["data", "project", "isOwner"],
-        ["data", "project", "isPublic"],
-        ["data", "project", "isQRCodeScanned"],
-        ["data", "project", "isLiveTesting"],
-        ["data", "project", "settings", "packageName"],
-        ["data", "project", "projectSettings", "packageName"],
-        ["data", "project", "storageSize"],
-        ["data", "project", "webAppSettings"],
-        ["data", "project", "webCompanionSettings"],
-        ["data", "project", "frontendProperties"],
-        ["data", "project", "appId"],
-        ["data", "project", "readOnly"],
-        ["data", "project", "shares"],
-        ["data", "project", "versions"],
-        ["data", "project", "shares"],
-        ["data", "project", "projectSnapshotsMetaData"],
-        ["data", "project", "projectSnapshotParentId"],
-        ["data", "project", "projectSnapshotParent"],
-        ["data", "project", "updatedAt"],
-        ["data", "project", "username"],
-    ]
+def match_clean_rules(trie: dict, path: tuple):
+    """
+    Find the parts of a compiled rule trie that apply to the value at a path, so that the value can be cleaned on its
+    own with prune.
 
-    iproject = project["data"]["project"]
-    for screen_id in iproject["blockly"]:
-        for prop in ["code", "appVariableDefCode"]:
-            if prop in iproject["blockly"][screen_id]:
-                dirty_paths.append(
-                    ["data", "project", "blockly", screen_id, prop]
-                )
+    Parameters
+    ----------
+    trie: The compiled rules (see compile_clean_rules).
+    path: The keys leading to the value.
+
+    Returns
+    -------
+    The sub-tries to prune the value with, or None if a rule deletes the value itself.
+    """
+    nodes = [trie]
+    for key in path:
+        # prune does not descend into lists, so no rule applies below a list index. Matching "*" against the index
+        # would clean streamed values that a regular pull keeps.
+        if not isinstance(key, str):
+            return []
+        matched = []
+        for node in nodes:
+            for child in (node.get(key), node.get("*")):
+                if child is None:
+                    continue
+                if CLEAN_RULE_END in child:
+                    return None
+                matched.append(child)
+        nodes = matched
+    return nodes
 
-    for path in dirty_paths:
-        delete_path_if_exists(d=project, path=path)
 
+def to_clean_project(project: dict) -> dict:
+    """
+    Remove the user specific, generated and volatile data from a Thunkable project. The default rules are in
+    DIRTY_PATHS. More rules can be added as "CLEAN_PATHS" in config.json, e.g. ["data/project/blockly/*/someProp"].
+
+    Parameters
+    ----------
+    project: The Thunkable project. It is cleaned in place, without a copy.
+
+    Returns
+    -------
+    The cleaned Thunkable project.
+    """
+    prune(d=project, trie=get_clean_rules(getConfig().clean_paths))
     return project
 
 
-def build_pull_request(project_id: str) -> dict:
+def build_pull_request(project_id: str, archive_filename: str = None) -> dict:
+    variables = {"id": project_id}
+    if archive_filename is not None:
+        variables["archiveFilename"] = archive_filename
     return {
         "url": "https://x.thunkable.com/graphql",
-        "cookies": {"thunk_token": getThunkableToken()},
+        "cookies": {"thunk_token": getConfig().thunkable_token},
         "json": {
             "operationName": "Project",
+            "variables": variables,
+            "query": "query Project($id:ID!,$archiveFilename:String){\n project(id:$id,archiveFilename:$archiveFilename){\n id\n apiComponents\n assets\n backendUpgradeVersion\n blockly\n blocklyStringLength\n categories\n components\n componentStringLength\n createdAt\n figmaComponents\n description\n email\n hash\n icon\n isArchiveProjectFileUsed\n isHiddenFromPublicGallery\n isLegacy\n isOwner\n isPublic\n isQRCodeScanned\n isLiveTesting\n projectName\n settings{\n teamId\n appName\n packageName\n icon\n autoIncrementVersion\n ignoreNotchArea\n notchAreaColor\n androidVersionName\n androidVersionCode\n iosVersionNumber\n iosBuildNumber\n firebaseAPIKey\n firebaseDatabaseURL\n stripePublishableKeyTest\n stripePublishableKeyLive\n stripeAccountId\n stripeTestMode\n isPublic\n description\n mobileTutorial\n pushNotificationAndroidAppId\n pushNotificationIOSAppId\n pushNotificationGeolocationEnabled\n yandexAPIKey\n imageRecognizerServerURL\n imageRecognizerSubscriptionKey\n cloudName\n cloudinaryAPIKey\n cloudinaryAPISecret\n permissions\n googleMapAPIKeyAndroid\n googleMapAPIKeyIOS\n googleOAuthiOSClientID\n googleOAuthiOSURLScheme\n googleOAuthWebClientID\n appleOAuthWebClientID\n appleOAuthWebRedirectURI\n admobAppIdIOS\n admobAppIdAndroid\n admobUserTrackingUsageDescription\n __typename\n}\n projectSettings{\n teamId\n appName\n packageName\n icon\n autoIncrementVersion\n ignoreNotchArea\n notchAreaColor\n androidVersionName\n androidVersionCode\n iosVersionNumber\n iosBuildNumber\n firebaseAPIKey\n firebaseDatabaseURL\n stripePublishableKeyTest\n stripePublishableKeyLive\n stripeAccountId\n stripeTestMode\n isPublic\n description\n mobileTutorial\n pushNotificationAndroidAppId\n pushNotificationIOSAppId\n pushNotificationGeolocationEnabled\n yandexAPIKey\n imageRecognizerServerURL\n imageRecognizerSubscriptionKey\n cloudName\n cloudinaryAPIKey\n cloudinaryAPISecret\n permissions\n googleMapAPIKeyAndroid\n googleMapAPIKeyIOS\n googleOAuthiOSClientID\n googleOAuthiOSURLScheme\n googleOAuthWebClientID\n appleOAuthWebClientID\n appleOAuthWebRedirectURI\n admobAppIdIOS\n admobAppIdAndroid\n admobUserTrackingUsageDescription\n __typename\n}\n hasAdmob\n hasBluetoothLowEnergy\n hasPushNotification\n hasAssistant\n storageSize\n dataSourceLinks{\n id\n dataSource{\n id\n name\n configuration{\n id\n type\n __typename\n}\n collections{\n id\n name\n label\n fields{\n id\n name\n label\n type\n __typename\n}\n __typename\n}\n __typename\n}\n __typename\n}\n localDataSources\n customProperties{\n uuid\n name\n componentType\n type\n defaultValue\n __typename\n}\n appId\n modules{\n id\n name\n type\n blockly\n components\n apiComponents\n isApi\n projectName\n timeSaved\n assets\n customProperties{\n uuid\n name\n componentType\n type\n defaultValue\n __typename\n}\n customEvents{\n uuid\n parameters\n name\n __typename\n}\n customMethods{\n uuid\n parameters\n name\n hasOutput\n __typename\n}\n __typename\n}\n usesDragDropUi\n totalCopy\n totalStar\n starAction\n variables\n webAppSettings{\n appLink\n createdAt\n hasPhoneFrame\n isVisible\n webAppId\n __typename\n}\n webCompanionSettings{\n customDomain{\n checkedAt\n domain\n verifiedAt\n __typename\n}\n icon\n webAppId\n __typename\n}\n frontendProperties{\n componentTreeCollapsedMap\n __typename\n}\n defaultDesignerDevice\n defaultDesignerOrientation\n readOnly\n shares\n versions\n schemaVersion\n organization\n projectSnapshotsMetaData{\n snapshot{\n id\n projectSnapshotParentId\n __typename\n}\n title\n createdAt\n isCurrentVersion\n numberOfScreens\n isAutoSnapshot\n archiveFilename\n creator{\n username\n __typename\n}\n __typename\n}\n projectSnapshotParentId\n projectSnapshotParent{\n id\n projectSnapshotsMetaData{\n snapshot{\n id\n projectSnapshotParentId\n __typename\n}\n title\n createdAt\n isCurrentVersion\n numberOfScreens\n isAutoSnapshot\n archiveFilename\n creator{\n username\n __typename\n}\n __typename\n}\n __typename\n}\n updatedAt\n username\n __typename\n}\n user{\n id\n __typename\n}\n}\n",
+        },
+    }
+
+
+def build_status_request(project_id: str) -> dict:
+    return {
+        "url": "https://x.thunkable.com/graphql",
+        "cookies": {"thunk_token": getConfig().thunkable_token},
+        "json": {
+            "operationName": "ProjectStatus",
             "variables": {
                 "id": project_id,
             },
-            "query": "query Project($id:ID!,$archiveFilename:String){\n project(id:$id,archiveFilename:$archiveFilename){\n id\n apiComponents\n assets\n backendUpgradeVersion\n blockly\n blocklyStringLength\n categories\n components\n componentStringLength\n createdAt\n figmaComponents\n description\n email\n hash\n icon\n isArchiveProjectFileUsed\n isHiddenFromPublicGallery\n isLegacy\n isOwner\n isPublic\n isQRCodeScanned\n isLiveTesting\n projectName\n settings{\n teamId\n appName\n packageName\n icon\n autoIncrementVersion\n ignoreNotchArea\n notchAreaColor\n androidVersionName\n androidVersionCode\n iosVersionNumber\n iosBuildNumber\n firebaseAPIKey\n firebaseDatabaseURL\n stripePublishableKeyTest\n stripePublishableKeyLive\n stripeAccountId\n stripeTestMode\n isPublic\n description\n mobileTutorial\n pushNotificationAndroidAppId\n pushNotificationIOSAppId\n pushNotificationGeolocationEnabled\n yandexAPIKey\n imageRecognizerServerURL\n imageRecognizerSubscriptionKey\n cloudName\n cloudinaryAPIKey\n cloudinaryAPISecret\n permissions\n googleMapAPIKeyAndroid\n googleMapAPIKeyIOS\n googleOAuthiOSClientID\n googleOAuthiOSURLScheme\n googleOAuthWebClientID\n appleOAuthWebClientID\n appleOAuthWebRedirectURI\n admobAppIdIOS\n admobAppIdAndroid\n admobUserTrackingUsageDescription\n __typename\n}\n projectSettings{\n teamId\n appName\n packageName\n icon\n autoIncrementVersion\n ignoreNotchArea\n notchAreaColor\n androidVersionName\n androidVersionCode\n iosVersionNumber\n iosBuildNumber\n firebaseAPIKey\n firebaseDatabaseURL\n stripePublishableKeyTest\n stripePublishableKeyLive\n stripeAccountId\n stripeTestMode\n isPublic\n description\n mobileTutorial\n pushNotificationAndroidAppId\n pushNotificationIOSAppId\n pushNotificationGeolocationEnabled\n yandexAPIKey\n imageRecognizerServerURL\n imageRecognizerSubscriptionKey\n cloudName\n cloudinaryAPIKey\n cloudinaryAPISecret\n permissions\n googleMapAPIKeyAndroid\n googleMapAPIKeyIOS\n googleOAuthiOSClientID\n googleOAuthiOSURLScheme\n googleOAuthWebClientID\n appleOAuthWebClientID\n appleOAuthWebRedirectURI\n admobAppIdIOS\n admobAppIdAndroid\n admobUserTrackingUsageDescription\n __typename\n}\n hasAdmob\n hasBluetoothLowEnergy\n hasPushNotification\n hasAssistant\n storageSize\n dataSourceLinks{\n id\n dataSource{\n id\n name\n configuration{\n id\n type\n __typename\n}\n collections{\n id\n name\n label\n fields{\n id\n name\n label\n type\n __typename\n}\n __typename\n}\n __typename\n}\n __typename\n}\n localDataSources\n customProperties{\n uuid\n name\n componentType\n type\n defaultValue\n __typename\n}\n appId\n modules{\n id\n name\n type\n blockly\n components\n apiComponents\n isApi\n projectName\n timeSaved\n assets\n customProperties{\n uuid\n name\n componentType\n type\n defaultValue\n __typename\n}\n customEvents{\n uuid\n parameters\n name\n __typename\n}\n customMethods{\n uuid\n parameters\n name\n hasOutput\n __typename\n}\n __typename\n}\n usesDragDropUi\n totalCopy\n totalStar\n starAction\n variables\n webAppSettings{\n appLink\n createdAt\n hasPhoneFrame\n isVisible\n webAppId\n __typename\n}\n webCompanionSettings{\n customDomain{\n checkedAt\n domain\n verifiedAt\n __typename\n}\n icon\n webAppId\n __typename\n}\n frontendProperties{\n componentTreeCollapsedMap\n __typename\n}\n defaultDesignerDevice\n defaultDesignerOrientation\n readOnly\n shares\n versions\n schemaVersion\n organization\n projectSnapshotsMetaData{\n snapshot{\n id\n projectSnapshotParentId\n __typename\n}\n title\n createdAt\n isCurrentVersion\n numberOfScreens\n isAutoSnapshot\n archiveFilename\n creator{\n username\n __typename\n}\n __typename\n}\n projectSnapshotParentId\n projectSnapshotParent{\n id\n projectSnapshotsMetaData{\n snapshot{\n id\n projectSnapshotParentId\n __typename\n}\n title\n createdAt\n isCurrentVersion\n numberOfScreens\n isAutoSnapshot\n archiveFilename\n creator{\n username\n __typename\n}\n __typename\n}\n __typename\n}\n updatedAt\n username\n __typename\n}\n user{\n id\n __typename\n}\n}\n",
+            "query": "query ProjectStatus($id:ID!){\n project(id:$id){\n id\n hash\n updatedAt\n __typename\n}\n}\n",
         },
     }
 
 
-def build_push_request(project_id: str, project: dict) -> dict:
+def fetch_project_status(project_id: str, session: requests.Session = None) -> dict:
+    """
+    Fetch only the hash and last update time of a Thunkable project. This is much cheaper than a pull and is used to
+    detect whether a project changed.
+
+    Parameters
+    ----------
+    project_id: The Thunkable project ID.
+    session: An optional session to reuse connections across requests.
+
+    Returns
+    -------
+    The project status with "hash" and "updatedAt" keys, or None if the request failed.
+    """
+    request = build_status_request(project_id=project_id)
+    r = (session or requests).post(**request)
+    logging.debug("Sent status request")
+    logging.debug(f"\tr.content = {r.content}")
+
+    if b"project" not in r.content:
+        return None
+
+    # A gateway or HTML error page can mention "project" too, so a body that is not the expected JSON is a failure.
+    try:
+        status = load_json(r.content)
+    except ValueError as e:
+        logging.debug(f"\terror = {e}")
+        return None
+    if not isinstance(status, dict) or "errors" in status or not isinstance(status.get("data"), dict):
+        return None
+    if not isinstance(status["data"].get("project"), dict) or not status["data"]["project"]:
+        return None
+    return status["data"]["project"]
+
+
+def build_push_request(project_id: str, project: dict, module: dict = None) -> dict:
+    # The endpoint updates a single module when given a module ID and the content of that module.
     return {
         "url": "https://x.thunkable.com/project/updatecontent",
-        "cookies": {"thunk_token": getThunkableToken()},
+        "cookies": {"thunk_token": getConfig().thunkable_token},
         "json": {
             "projectOrModuleId": project_id,
             "checkHash": False,
-            "projectnewcontent": project["data"]["project"],
+            "projectnewcontent": module if module is not None else project["data"]["project"],
         },
     }
 
@@ -351,18 +815,25 @@ def safe_clean_path(path: Path) -> None:
     path.mkdir(exist_ok=True)
 
 
-def pull(project_id: str, path: Path, modular: bool, clean: bool) -> None:
-    logging.debug("Pulling with")
-    logging.debug(f"\tproject_id = {project_id}")
-    logging.debug(f"\tpath = {path}")
-    logging.debug(f"\tmodular = {modular}")
-    logging.debug(f"\tclean = {clean}")
+def fetch_project(project_id: str, archive_filename: str = None, session: requests.Session = None) -> dict:
+    """
+    Fetch a Thunkable project, or one of its snapshots.
 
-    request = build_pull_request(project_id=project_id)
+    Parameters
+    ----------
+    project_id: The Thunkable project ID.
+    archive_filename: The archive file name of a snapshot to fetch instead of the current version.
+    session: An optional session to reuse connections across requests.
+
+    Returns
+    -------
+    The Thunkable project.
+    """
+    request = build_pull_request(project_id=project_id, archive_filename=archive_filename)
     logging.debug("Built request")
     logging.debug(f"\trequest = {request}")
 
-    r = requests.post(**request)
+    r = (session or requests).post(**request)
     logging.debug("Sent request")
     logging.debug(f"\tr.content = {r.content}")
 
@@ -381,31 +852,486 @@ def pull(project_id: str, path: Path, modular: bool, clean: bool) -> None:
         logging.debug("The thunk_token might have expired. Reset the thunk_token.")
         exit(1)
 
+    return project
+
+
+def list_snapshots(project: dict) -> list:
+    """
+    List the snapshots of a Thunkable project from oldest to newest. If the project is itself a snapshot, the
+    snapshots of its parent are listed. This must be called before cleaning, which removes the snapshot metadata.
+
+    Parameters
+    ----------
+    project: The Thunkable project.
+
+    Returns
+    -------
+    The snapshot metadata, each with "title", "createdAt", "archiveFilename" and "isCurrentVersion" keys.
+    """
+    iproject = project["data"]["project"]
+    snapshots = iproject.get("projectSnapshotsMetaData")
+    if not snapshots and iproject.get("projectSnapshotParent"):
+        snapshots = iproject["projectSnapshotParent"].get("projectSnapshotsMetaData")
+    return sorted(snapshots or [], key=snapshot_timestamp)
+
+
+def snapshot_timestamp(snapshot: dict) -> float:
+    """
+    Get the creation time of a snapshot. Thunkable reports it either in epoch milliseconds or as an ISO 8601 date.
+
+    Parameters
+    ----------
+    snapshot: The snapshot metadata.
+
+    Returns
+    -------
+    The creation time in seconds since the epoch, or 0 if it is unknown.
+    """
+    created_at = snapshot.get("createdAt")
+    if created_at is None or created_at == "":
+        return 0.0
+    if isinstance(created_at, (int, float)) or str(created_at).isdigit():
+        return int(created_at) / 1000
+    return datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).timestamp()
+
+
+def pull_to_memory(project_id: str, modular: bool, clean: bool, project_name: str = None,
+                   session: requests.Session = None) -> dict:
+    """
+    Pull a Thunkable project into an in-memory modular project, without touching the disk. A non-modular project is
+    returned as a modular project with only "meta.json".
+
+    Parameters
+    ----------
+    project_id: The Thunkable project ID.
+    modular: Whether to split the project into screens and modules.
+    clean: Whether to clean the project (see to_clean_project).
+    project_name: An optional project name to set on the pulled project.
+    session: An optional session to reuse connections across requests.
+
+    Returns
+    -------
+    The modular project.
+    """
+    project = fetch_project(project_id=project_id, session=session)
+
     if clean:
         project = to_clean_project(project=project)
         logging.debug("Cleaned project")
         logging.debug(f"\tproject = {project}")
 
+    if project_name is not None:
+        project["data"]["project"]["projectName"] = project_name
+
+    if not modular:
+        return {"meta.json": project}
+
+    modular_project = to_modular_project(project=project)
+    logging.debug("Built modular project")
+    logging.debug(f"\tmodular_project = {modular_project}")
+    return modular_project
+
+
+def encode_modular_project(modular_project: dict, workers: int = None) -> dict:
+    """
+    Convert a modular project to the bytes of each of its files, exactly as they are written to disk. Large projects
+    are encoded across worker processes, like write_modular_project.
+
+    Parameters
+    ----------
+    modular_project: The modular project.
+    workers: The number of worker processes. Defaults to the number of CPUs. Use 1 to encode serially.
+
+    Returns
+    -------
+    A mapping from file names to file content (bytes).
+    """
+    parallel = get_parallel_jobs(modular_project=modular_project, workers=workers)
+    if parallel is None:
+        return {name: dump_modular_file(name=name, data=data).encode("utf-8") for name, data in modular_project.items()}
+
+    workers, jobs = parallel
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(encode_pickled_modular_file, name, pickled_data) for name, pickled_data in jobs}
+        return {name: futures[name].result() for name in modular_project}
+
+
+class JSONStreamReader:
+    """
+    Read JSON text incrementally from an iterable of byte chunks. Only the text of the value being read is buffered,
+    the text before it is dropped as the reader moves on.
+    """
+
+    # The characters that open, close or quote something inside a JSON container.
+    STRUCTURE = re.compile(r'["{}\[\]]')
+
+    # The characters that can follow a number or a literal.
+    LITERAL_END = re.compile(r"[,}\]\s]")
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+
+    def fill(self) -> bool:
+        """
+        Append the next chunk of text to the buffer.
+
+        Returns
+        -------
+        False if the input is exhausted, True otherwise.
+        """
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+        text = self.decoder.decode(b"", final=True)
+        self.buffer += text
+        return bool(text)
+
+    def compact(self) -> None:
+        """
+        Drop the text that has already been read. This must not be called while a value is being read.
+        """
+        if self.pos >= STREAM_CHUNK_SIZE:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and get the next character without consuming it.
+
+        Returns
+        -------
+        The next character, or "" at the end of the input.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self.pos} of the JSON stream.")
+        self.pos += 1
+
+    def read_string(self) -> str:
+        """
+        Read a JSON string, which must be the next value.
+
+        Returns
+        -------
+        The JSON text of the string, including the quotes.
+        """
+        if self.peek() != '"':
+            raise ValueError(f"Expected a string at position {self.pos} of the JSON stream.")
+        start = self.pos
+        i = start + 1
+        while True:
+            end = self.buffer.find('"', i)
+            if end == -1:
+                i = len(self.buffer)
+                if not self.fill():
+                    raise ValueError("Unterminated string in the JSON stream.")
+                continue
+            # A quote preceded by an odd number of backslashes is escaped.
+            backslashes = end - 1
+            while self.buffer[backslashes] == "\\":
+                backslashes -= 1
+            if (end - 1 - backslashes) % 2 == 1:
+                i = end + 1
+                continue
+            self.pos = end + 1
+            return self.buffer[start:self.pos]
+
+    def read_value(self) -> str:
+        """
+        Read a complete JSON value without parsing it.
+
+        Returns
+        -------
+        The JSON text of the value.
+        """
+        char = self.peek()
+        if char == "":
+            raise ValueError("Unexpected end of the JSON stream.")
+        if char == '"':
+            return self.read_string()
+
+        start = self.pos
+        if char in "{[":
+            depth = 0
+            i = start
+            while True:
+                match = self.STRUCTURE.search(self.buffer, i)
+                if match is None:
+                    i = len(self.buffer)
+                    if not self.fill():
+                        raise ValueError("Unexpected end of the JSON stream.")
+                    continue
+                if match.group() == '"':
+                    self.pos = match.start()
+                    self.read_string()
+                    i = self.pos
+                    continue
+                depth += 1 if match.group() in "{[" else -1
+                i = match.end()
+                if depth == 0:
+                    self.pos = i
+                    return self.buffer[start:i]
+
+        while True:
+            match = self.LITERAL_END.search(self.buffer, start)
+            if match is not None or not self.fill():
+                self.pos = match.start() if match is not None else len(self.buffer)
+                return self.buffer[start:self.pos]
+
+
+def stream_json_value(reader: JSONStreamReader, spec, path: tuple, on_value) -> str:
+    """
+    Read a JSON value from a stream, handing the values selected by spec over one at a time as soon as each of them is
+    complete. Only the containers on the way to the selected values are walked, everything else is copied unparsed.
+
+    Parameters
+    ----------
+    reader: The stream reader.
+    spec: A nested mapping from keys to the specs of their values, or STREAM_SPLIT to select every member of the value.
+    path: The keys leading to the value.
+    on_value: Called with the path and the JSON text of every selected value. It returns the JSON text that replaces
+        the value, or None to leave the value out.
+
+    Returns
+    -------
+    The JSON text of the value, with the selected values replaced.
+    """
+    char = reader.peek()
+    if char not in ("{", "["):
+        return reader.read_value()
+    reader.pos += 1
+
+    is_object = char == "{"
+    members = []
+    index = 0
+    while True:
+        char = reader.peek()
+        if char == ("}" if is_object else "]"):
+            reader.pos += 1
+            break
+        if index:
+            reader.expect(",")
+
+        if is_object:
+            raw_key = reader.read_string()
+            key = load_json(raw_key)
+            reader.expect(":")
+        else:
+            key = index
+        index += 1
+
+        if spec == STREAM_SPLIT:
+            text = on_value(path + (key,), reader.read_value())
+        elif is_object and key in spec:
+            text = stream_json_value(reader=reader, spec=spec[key], path=path + (key,), on_value=on_value)
+        else:
+            text = reader.read_value()
+        reader.compact()
+
+        if text is not None:
+            members.append(f"{raw_key}:{text}" if is_object else text)
+
+    return ("{%s}" if is_object else "[%s]") % ",".join(members)
+
+
+def pull_streaming(project_id: str, path: Path, clean: bool, project_name: str = None,
+                   session: requests.Session = None) -> None:
+    """
+    Pull a Thunkable project into a modular project on disk while the response is still being received. Each screen,
+    module and blockly entry is cleaned and written as soon as it has been read, so the memory used stays close to
+    the largest of them instead of the whole project. The files written are the same as those of a modular pull.
+
+    Parameters
+    ----------
+    project_id: The Thunkable project ID.
+    path: The project path. Its previous content is deleted.
+    clean: Whether to clean the project (see to_clean_project).
+    project_name: An optional project name to set on the pulled project.
+    session: An optional session to reuse connections across requests.
+
+    Returns
+    -------
+    None
+    """
+    request = build_pull_request(project_id=project_id)
+    logging.debug("Built request")
+    logging.debug(f"\trequest = {request}")
+
+    rules = get_clean_rules(getConfig().clean_paths) if clean else {}
+
+    # The blocks of the screens usually arrive before the screens themselves, so they are parked next to the project
+    # path until the screen names are known.
+    blockly_path = path.parent.joinpath(f".{path.name}.blockly")
     safe_clean_path(path=path)
+    safe_clean_path(path=blockly_path)
+
+    screen_id_to_name = {}
+    blockly_ids = []
+
+    def write_screen(screen: dict) -> None:
+        screen_name, screen_id = screen["name"], screen["id"]
+        file_name, data = split_screen(screen=screen)
+        write_modular_file(file_path=path.joinpath(file_name), data=data)
+        screen_id_to_name[screen_id] = screen_name
+
+    def on_value(value_path: tuple, text: str) -> str:
+        # Every value is cleaned before it is written, so the files match those of a modular pull of the cleaned
+        # project. A value deleted by a rule is left out of the project altogether.
+        tries = match_clean_rules(trie=rules, path=value_path)
+        if tries is None:
+            return None
+        value = load_json(text)
+        for trie in tries:
+            prune(d=value, trie=trie)
+        section = value_path[2]
+        if section == "blockly":
+            if isinstance(value, dict) and "xml" in value:
+                with open(blockly_path.joinpath(f"{len(blockly_ids)}.xml"), "w", encoding="utf-8", newline="") as f:
+                    f.write(value["xml"])
+                blockly_ids.append(value_path[3])
+                value["xml"] = ""
+        elif section == "components":
+            if "Navigator" in value["type"]:
+                for screen in value["children"]:
+                    write_screen(screen=screen)
+            else:
+                write_screen(screen=value)
+        else:
+            for file_name, data in split_module(module=value).items():
+                write_modular_file(file_path=path.joinpath(file_name), data=data)
+        logging.debug(f"Streamed {'/'.join(map(str, value_path))}")
+        return json.dumps(value)
+
+    try:
+        with (session or requests).post(**request, stream=True) as r:
+            reader = JSONStreamReader(chunks=r.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            project = load_json(stream_json_value(reader=reader, spec=PULL_STREAM_SPEC, path=(), on_value=on_value))
+    except ValueError as e:
+        logging.debug(f"\terror = {e}")
+        project = {}
+
+    if "errors" in project or not isinstance(project.get("data"), dict) or not project["data"].get("project"):
+        shutil.rmtree(path=blockly_path, ignore_errors=True)
+        logging.fatal("Failed to pull Thunkable project.")
+        logging.debug("The project_id might be invalid. Check that the project_id is valid.")
+        logging.debug("The thunk_token might have expired. Reset the thunk_token.")
+        exit(1)
+
+    if clean:
+        prune(d=project, trie=rules)
+
+    if project_name is not None:
+        project["data"]["project"]["projectName"] = project_name
+
+    # Move the parked blocks next to their screens. The blocks of screens that no longer exist stay in the metadata.
+    iproject = project["data"]["project"]
+    for i, screen_id in enumerate(blockly_ids):
+        with open(blockly_path.joinpath(f"{i}.xml"), encoding="utf-8", newline="") as f:
+            xml = f.read()
+        if screen_id in screen_id_to_name:
+            write_modular_file(file_path=path.joinpath(f"{screen_id_to_name[screen_id]}.{screen_id}.xml"), data=xml)
+        else:
+            iproject["blockly"][screen_id]["xml"] = xml
+    shutil.rmtree(path=blockly_path, ignore_errors=True)
+
+    write_modular_file(file_path=path.joinpath("meta.json"), data=project)
+
+
+def pull(project_id: str, path: Path, modular: bool, clean: bool, session: requests.Session = None,
+         stream: bool = False, project_name: str = None) -> None:
+    logging.debug("Pulling with")
+    logging.debug(f"\tproject_id = {project_id}")
+    logging.debug(f"\tpath = {path}")
+    logging.debug(f"\tmodular = {modular}")
+    logging.debug(f"\tclean = {clean}")
+    logging.debug(f"\tstream = {stream}")
+
+    # Only a modular project can be written piece by piece, a non-modular project is a single file anyway.
+    if stream and modular:
+        pull_streaming(project_id=project_id, path=path, clean=clean, project_name=project_name, session=session)
+        return
+
+    modular_project = pull_to_memory(project_id=project_id, modular=modular, clean=clean, project_name=project_name,
+                                     session=session)
+
+    safe_clean_path(path=path)
+    write_modular_project(modular_project=modular_project, project_path=path)
 
-    if modular:
-        modular_project = to_modular_project(project=project)
-        logging.debug("Built modular project")
-        logging.debug(f"\tmodular_project = {modular_project}")
-        write_modular_project(modular_project=modular_project, project_path=path)
-    else:
-        path.joinpath("meta.json").write_text(dump_json(project))
+
+def get_push_state_path(project_path: Path) -> Path:
+    """
+    Get the file that records the content hashes of the last push from a project path.
+
+    Parameters
+    ----------
+    project_path: The project path.
+
+    Returns
+    -------
+    The push state path.
+    """
+    return project_path.parent.joinpath(f".{project_path.name}.pushed.json")
+
+
+def hash_push_content(project: dict) -> dict:
+    """
+    Hash the parts of a Thunkable project that can be pushed separately. The top level hash covers everything except
+    the content of the modules, but does include which modules exist and in what order.
+
+    Parameters
+    ----------
+    project: The Thunkable project.
+
+    Returns
+    -------
+    The hashes, as {"top": <hash>, "modules": {<module_id>: <hash>}}.
+    """
+    def digest(data) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    iproject = project["data"]["project"]
+    modules = iproject.get("modules") or []
+    top = {key: value for key, value in iproject.items() if key != "modules"}
+    top["modules"] = [module["id"] for module in modules]
+    return {"top": digest(top), "modules": {module["id"]: digest(module) for module in modules}}
+
+
+def send_push_request(request: dict) -> None:
+    logging.debug("Built request")
+    logging.debug(f"\trequest = {request}")
+
+    r = requests.post(**request)
+    logging.debug("Sent request")
+    logging.debug(f"\tr.content = {r.content}")
+
+    if b"hash" not in r.content:
+        logging.fatal("Failed to push Thunkable project.")
+        logging.info("The project_id might be invalid. Check that the project_id is valid.")
+        logging.info("The thunk_token might have expired. Reset the thunk_token.")
+        exit(1)
 
 
-def push(project_id: str, path: str, modular: bool) -> None:
+def push(project_id: str, path: str, modular: bool, granular: bool = False) -> None:
     
     logging.debug("Pushing with")
     logging.debug(f"\tproject_id = {project_id}")
     logging.debug(f"\tpath = {path}")
     logging.debug(f"\tmodular = {modular}")
+    logging.debug(f"\tgranular = {granular}")
 
     if modular:
-        modular_project = read_modular_project(project_path=path)
+        modular_project = read_modular_project(project_path=path, use_cache=True)
         logging.debug("Loaded modular project")
         logging.debug(f"\tmodular_project = {modular_project}")
 
@@ -413,23 +1339,25 @@ def push(project_id: str, path: str, modular: bool) -> None:
         logging.debug("Built project")
         logging.debug(f"\tproject = {project}")
     else:
-        project = load_json(path.joinpath("meta.json").read_text())
+        project = load_cached_file(path=path.joinpath("meta.json"), load_func=load_json, cache_path=get_cache_path(project_path=path))
         logging.debug("Loaded project")
         logging.debug(f"\tproject = {project}")
-    
-    request = build_push_request(project_id=project_id, project=project)
-    logging.debug("Built request")
-    logging.debug(f"\trequest = {request}")
 
-    r = requests.post(**request)
-    logging.debug("Sent request")
-    logging.debug(f"\tr.content = {r.content}")
+    hashes = hash_push_content(project=project)
+    state_path = get_push_state_path(project_path=path)
+    last_state = load_json(state_path.read_text()) if state_path.exists() else {}
+
+    # Only the changed modules need to be pushed if everything else is the same as in the last push to this project.
+    if granular and last_state.get("project_id") == project_id and last_state.get("top") == hashes["top"]:
+        modules = {module["id"]: module for module in project["data"]["project"].get("modules") or []}
+        changed = [module_id for module_id in modules if last_state["modules"].get(module_id) != hashes["modules"][module_id]]
+        logging.info(f"Pushing {len(changed)} changed module(s)")
+        for module_id in changed:
+            send_push_request(request=build_push_request(project_id=module_id, project=project, module=modules[module_id]))
+    else:
+        send_push_request(request=build_push_request(project_id=project_id, project=project))
 
-    if b"hash" not in r.content:
-        logging.fatal("Failed to push Thunkable project.")
-        logging.info("The project_id might be invalid. Check that the project_id is valid.")
-        logging.info("The thunk_token might have expired. Reset the thunk_token.")
-        exit(1)
+    state_path.write_text(dump_json({"project_id": project_id, **hashes}))
 
 
 # def build_parser() -> argparse.ArgumentParser: